@@ -0,0 +1,286 @@
+# external/agents_service/benchmark.py
+# Offline load test for the agents host.
+
+"""Benchmark /agents/create, /agents/route and /dyn/{agent_id} as the agent count grows.
+
+Runs fully offline: the SignalWire SDK is replaced by a local stand-in that
+builds lightweight agents and mounts a router per agent, so the numbers cover
+this service (registry, template sharing, lazy builds, FAQ retrieval) rather
+than the SDK or the network.
+
+Usage:
+    python benchmark.py --scales 10,100,1000,10000 --faqs 100 --unique-ratio 0.1
+"""
+import argparse
+import gc
+import importlib
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_WORDS = (
+    "account billing password reset refund order shipping delivery invoice plan upgrade cancel "
+    "support hours location parking warranty return exchange login email phone address payment "
+    "card discount coupon trial subscription device app update install error outage status"
+).split()
+
+
+def _install_stand_in():
+    """Register a fake signalwire_agents package exposing the pieces main.py uses."""
+    from fastapi import APIRouter, Body, FastAPI
+
+    class SwaigFunctionResult:
+        def __init__(self, response: str):
+            self.response = response
+
+        def to_dict(self):
+            return {"response": self.response}
+
+    class AgentBase:
+        """Mirrors the SDK's tool registration: methods marked with AgentBase.tool are bound at init."""
+
+        def __init__(self, name: str, **config):
+            self.name = name
+            self.config = config
+            self.params: Dict = {}
+            self.global_data: Dict = {}
+            self.sections: Dict = {}
+            self.tools: Dict = {}
+            cls = type(self)
+            for attr_name in dir(cls):
+                attr = getattr(cls, attr_name)
+                if getattr(attr, "_is_tool", False):
+                    self.tools[attr._tool_name] = attr.__get__(self, cls)
+
+        @classmethod
+        def tool(cls, name=None, **kwargs):
+            def decorator(func):
+                func._is_tool = True
+                func._tool_name = name or func.__name__
+                return func
+            return decorator
+
+        def set_params(self, params):
+            self.params.update(params)
+
+        def set_global_data(self, data):
+            self.global_data.update(data)
+
+        def define_tool(self, name, description, parameters, handler):
+            self.tools[name] = handler
+
+        def prompt_add_section(self, title, body=None, bullets=None, subsections=None):
+            self.sections[title] = {"body": body, "bullets": bullets, "subsections": subsections}
+
+        def as_router(self) -> APIRouter:
+            router = APIRouter()
+
+            @router.get("/")
+            async def swml():
+                return {"agent": self.name, "params": self.params}
+
+            @router.post("/swaig")
+            async def swaig(payload: dict = Body(...)):
+                handler = self.tools.get(payload.get("function"))
+                if handler is None:
+                    return {"response": "unknown function"}
+                result = handler(payload.get("argument", {}), payload)
+                return result.to_dict() if isinstance(result, SwaigFunctionResult) else result
+
+            return router
+
+    class ReceptionistAgent(AgentBase):
+        pass
+
+    class InfoGathererAgent(AgentBase):
+        pass
+
+    class FAQBotAgent(AgentBase):
+        """Same construction hooks and built-in search_faqs as the SDK prefab."""
+
+        def __init__(self, faqs, suggest_related=True, persona=None, name="faq_bot", **kwargs):
+            super().__init__(name=name, **kwargs)
+            self.faqs = faqs
+            self.suggest_related = suggest_related
+            self.persona = persona or "You are a helpful FAQ bot."
+            self._build_faq_bot_prompt()
+            self._configure_agent_settings()
+
+        def _build_faq_bot_prompt(self):
+            self.prompt_add_section("Personality", body=self.persona)
+            self.prompt_add_section(
+                "FAQ Database",
+                body="Here is your database of frequently asked questions and answers:",
+                subsections=[{"title": f["question"], "body": f["answer"]} for f in self.faqs],
+            )
+
+        def _configure_agent_settings(self):
+            self.set_global_data({"faq_count": len(self.faqs)})
+
+        @AgentBase.tool(name="search_faqs")
+        def search_faqs(self, args, raw_data):
+            query = args.get("query", "").lower()
+            hits = [f["question"] for f in self.faqs if query and query in f["question"].lower()][:3]
+            return SwaigFunctionResult("\n".join(hits) if hits else "No matching FAQs found.")
+
+    class AgentServer:
+        def __init__(self, host: str = "0.0.0.0", port: int = 8100):
+            self.app = FastAPI()
+            self.agents: Dict = {}
+
+        def register(self, agent, route: str):
+            self.agents[route] = agent
+            self.app.include_router(agent.as_router(), prefix=route)
+
+        def unregister(self, route: str) -> bool:
+            return self.agents.pop(route, None) is not None
+
+    package = types.ModuleType("signalwire_agents")
+    prefabs = types.ModuleType("signalwire_agents.prefabs")
+    prefabs.ReceptionistAgent = ReceptionistAgent
+    prefabs.InfoGathererAgent = InfoGathererAgent
+    prefabs.FAQBotAgent = FAQBotAgent
+    agent_server = types.ModuleType("signalwire_agents.agent_server")
+    agent_server.AgentServer = AgentServer
+    core = types.ModuleType("signalwire_agents.core")
+    agent_base = types.ModuleType("signalwire_agents.core.agent_base")
+    agent_base.AgentBase = AgentBase
+    function_result = types.ModuleType("signalwire_agents.core.function_result")
+    function_result.SwaigFunctionResult = SwaigFunctionResult
+    sys.modules.update({
+        "signalwire_agents": package,
+        "signalwire_agents.prefabs": prefabs,
+        "signalwire_agents.agent_server": agent_server,
+        "signalwire_agents.core": core,
+        "signalwire_agents.core.agent_base": agent_base,
+        "signalwire_agents.core.function_result": function_result,
+    })
+
+
+def _faq_set(rng: random.Random, size: int) -> List[Dict[str, str]]:
+    return [
+        {
+            "question": f"How do I {' '.join(rng.sample(_WORDS, 3))}?",
+            "answer": " ".join(rng.sample(_WORDS, 12)),
+        }
+        for _ in range(size)
+    ]
+
+
+def _pct(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+
+def run_scale(n: int, args) -> Dict[str, float]:
+    from fastapi.testclient import TestClient
+
+    rng = random.Random(n)
+    templates = max(1, int(n * args.unique_ratio))
+    faq_sets = [_faq_set(rng, args.faqs) for _ in range(templates)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["AGENTS_DB"] = os.path.join(tmp, "agents.db")
+        gc.collect()
+        if args.memory:
+            tracemalloc.start()
+        import main
+        main = importlib.reload(main)
+        client = TestClient(main.app)
+        baseline = tracemalloc.get_traced_memory()[0] if args.memory else 0
+
+        create, route, dyn, lookup = [], [], [], []
+        for i in range(n):
+            body = {"agent_id": f"agent-{i}", "prefab": "faq-bot", "faqs": faq_sets[i % templates]}
+            started = time.perf_counter()
+            resp = client.post("/agents/create", json=body)
+            create.append(time.perf_counter() - started)
+            assert resp.status_code == 200, resp.text
+
+        sample = rng.sample(range(n), min(n, args.samples))
+        for i in sample:
+            started = time.perf_counter()
+            resp = client.get("/agents/route", params={"agent_id": f"agent-{i}"})
+            route.append(time.perf_counter() - started)
+            assert resp.status_code == 200, resp.text
+
+            started = time.perf_counter()
+            resp = client.get(f"/dyn/agent-{i}/")
+            dyn.append(time.perf_counter() - started)
+            assert resp.status_code == 200, resp.text
+
+            # Ask for an entry by its own question text; indexed bots must find it in the full set
+            faq = rng.choice(faq_sets[i % templates])
+            started = time.perf_counter()
+            resp = client.post(f"/dyn/agent-{i}/swaig", json={"function": "search_faqs", "argument": {"query": faq["question"]}})
+            lookup.append(time.perf_counter() - started)
+            assert resp.status_code == 200, resp.text
+            assert faq["answer"] in resp.json()["response"] or args.faqs <= main.FAQ_PROMPT_LIMIT, resp.text
+
+        gc.collect()
+        current = tracemalloc.get_traced_memory()[0] if args.memory else 0
+        tracemalloc.stop()
+        live = main.registry.stats()["loaded"]
+        client.close()
+
+    return {
+        "agents": n,
+        "templates": templates,
+        "live": live,
+        "create_p50": _pct(create, 0.50),
+        "create_p99": _pct(create, 0.99),
+        "route_p50": _pct(route, 0.50),
+        "route_p99": _pct(route, 0.99),
+        "dyn_p50": _pct(dyn, 0.50),
+        "dyn_p99": _pct(dyn, 0.99),
+        "lookup_p50": _pct(lookup, 0.50),
+        "lookup_p99": _pct(lookup, 0.99),
+        "kb_per_agent": (current - baseline) / 1024 / n,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="10,100,1000,10000", help="comma-separated agent counts")
+    parser.add_argument("--faqs", type=int, default=100, help="FAQ entries per agent")
+    parser.add_argument("--unique-ratio", type=float, default=0.1, help="distinct configs / agents")
+    parser.add_argument("--samples", type=int, default=500, help="agents sampled for route/dyn timings")
+    parser.add_argument(
+        "--no-memory", dest="memory", action="store_false",
+        help="skip tracemalloc (it slows every request, so latencies are lower without it)",
+    )
+    args = parser.parse_args()
+
+    _install_stand_in()
+    os.environ.setdefault("AGENTS_MAX_LOADED", "500")
+
+    header = (
+        f"{'agents':>7} {'tmpl':>6} {'live':>5} | {'create p50/p99 ms':>18} | {'route p50/p99 ms':>17} | "
+        f"{'dyn p50/p99 ms':>15} | {'lookup p50/p99 ms':>18} | {'KB/agent':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for n in (int(s) for s in args.scales.split(",")):
+        r = run_scale(n, args)
+        memory = f"{r['kb_per_agent']:>8.1f}" if args.memory else f"{'-':>8}"
+        print(
+            f"{r['agents']:>7} {r['templates']:>6} {r['live']:>5} | "
+            f"{r['create_p50']:>8.2f} / {r['create_p99']:>7.2f} | "
+            f"{r['route_p50']:>7.2f} / {r['route_p99']:>7.2f} | "
+            f"{r['dyn_p50']:>6.2f} / {r['dyn_p99']:>6.2f} | "
+            f"{r['lookup_p50']:>8.2f} / {r['lookup_p99']:>7.2f} | "
+            f"{memory}"
+        )
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,74 @@
+# external/agents_service/faq_agent.py
+# FAQ bot prefab backed by the BM25 index for FAQ sets too large for the prompt.
+
+"""FAQBotAgent variant that retrieves from the full FAQ set instead of listing it.
+
+The stock prefab puts every entry in its "FAQ Database" prompt section and its
+search_faqs tool only matches substrings of questions. This subclass keeps the
+whole set in a FAQIndex: the prompt describes the knowledge base, and search_faqs
+returns the top-k entries (questions and answers) for the caller's question.
+"""
+from typing import Dict, List
+
+from signalwire_agents.core.agent_base import AgentBase
+from signalwire_agents.core.function_result import SwaigFunctionResult
+from signalwire_agents.prefabs import FAQBotAgent
+
+from faq_index import FAQIndex
+
+
+class IndexedFAQBotAgent(FAQBotAgent):
+    def __init__(self, faqs: List[Dict[str, str]], index: FAQIndex, top_k: int = 3, **kwargs):
+        # Set before the prefab builds its prompt, which reads them
+        self.index = index
+        self.top_k = top_k
+        super().__init__(faqs=faqs, **kwargs)
+
+    def _build_faq_bot_prompt(self):
+        self.prompt_add_section("Personality", body=self.persona)
+        self.prompt_add_section(
+            "Goal",
+            body="Answer user questions with the most relevant entries from your FAQ knowledge base.",
+        )
+        instructions = [
+            "Before answering a question, call search_faqs with the caller's question.",
+            "Answer from the FAQ entries search_faqs returns.",
+            "If none of the returned entries answers the question, politely say you don't have that information.",
+            "Be concise and factual in your responses.",
+        ]
+        if self.suggest_related:
+            instructions.append(
+                "When appropriate, suggest other related questions from the search results that might be helpful."
+            )
+        self.prompt_add_section("Instructions", bullets=instructions)
+        self.prompt_add_section(
+            "FAQ Database",
+            body=(
+                f"Your knowledge base has {len(self.faqs)} frequently asked questions. They are not listed "
+                f"here; search_faqs returns the {self.top_k} entries most relevant to a query."
+            ),
+        )
+
+    @AgentBase.tool(
+        name="search_faqs",
+        description="Search the FAQ knowledge base for the entries most relevant to the caller's question",
+        parameters={
+            "query": {
+                "type": "string",
+                "description": "The caller's question"
+            },
+            "category": {
+                "type": "string",
+                "description": "Optional category to narrow the search"
+            }
+        }
+    )
+    def search_faqs(self, args, raw_data):
+        query = f"{args.get('query', '')} {args.get('category', '')}".strip()
+        matches = self.index.search(query, k=self.top_k)
+        if not matches:
+            return SwaigFunctionResult("No matching FAQs found.")
+        text = "Here are the most relevant FAQs:\n\n" + "\n\n".join(
+            f"{i}. Q: {m.get('question', '')}\nA: {m.get('answer', '')}" for i, m in enumerate(matches, 1)
+        )
+        return SwaigFunctionResult(text)
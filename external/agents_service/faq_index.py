@@ -0,0 +1,105 @@
+# external/agents_service/faq_index.py
+# BM25 retrieval index over an agent's FAQ entries.
+
+"""Per-agent FAQ retrieval.
+
+Large FAQ sets are indexed once (BM25 over question, answer and category text)
+so each turn only needs the top-k relevant entries instead of the whole list.
+Indexes are cached by a hash of the FAQ set; a live agent keeps a reference to
+its index, and the cache keeps recently unloaded ones for when they are rebuilt.
+"""
+import hashlib
+import heapq
+import json
+import math
+import re
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be can do does for from how i in is it my of on or the to what when where which who why "
+    "with you your".split()
+)
+
+
+def _stem(token: str) -> str:
+    """Crude suffix stripping so "opening"/"opens"/"opened" match "open" and plurals match singulars."""
+    for suffix in ("ing", "ed"):
+        if len(token) > len(suffix) + 3 and token.endswith(suffix):
+            return token[: -len(suffix)]
+    # "es" is only a plural suffix after s/x/z/ch/sh ("boxes", "addresses"); "services" just drops the "s"
+    if len(token) > 4 and token.endswith("es") and token[:-2].endswith(("s", "x", "z", "ch", "sh")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(t) for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class FAQIndex:
+    def __init__(self, faqs: List[Dict[str, str]], k1: float = 1.5, b: float = 0.75):
+        self.faqs = faqs
+        self.k1 = k1
+        self.b = b
+        # term -> [(doc, term frequency)]
+        self._postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._doc_len: List[int] = []
+        for doc, faq in enumerate(faqs):
+            # Question terms count twice: they describe what the entry answers
+            question = faq.get("question", "")
+            categories = " ".join(faq.get("categories", []))
+            tokens = tokenize(f"{question} {question} {faq.get('answer', '')} {categories}")
+            self._doc_len.append(len(tokens))
+            counts: Dict[str, int] = defaultdict(int)
+            for token in tokens:
+                counts[token] += 1
+            for token, tf in counts.items():
+                self._postings[token].append((doc, tf))
+        n = len(faqs)
+        self._avg_len = (sum(self._doc_len) / n) if n else 0.0
+        self._idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self._postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.faqs)
+
+    def search(self, query: str, k: int = 3) -> List[Dict[str, str]]:
+        """Top-k FAQ entries for the query; only documents sharing a term are scored."""
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for doc, tf in self._postings[term]:
+                norm = 1 - self.b + self.b * self._doc_len[doc] / self._avg_len
+                scores[doc] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [self.faqs[doc] for doc, _ in top]
+
+
+def faq_set_key(faqs: List[Dict[str, str]]) -> str:
+    canonical = json.dumps(faqs, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+_cache: "OrderedDict[str, FAQIndex]" = OrderedDict()
+
+
+def get_index(faqs: List[Dict[str, str]], max_cached: int = 256) -> FAQIndex:
+    """Return the cached index for this FAQ set, building it on first use."""
+    key = faq_set_key(faqs)
+    index = _cache.get(key)
+    if index is not None:
+        _cache.move_to_end(key)
+        return index
+    index = FAQIndex(faqs)
+    _cache[key] = index
+    while len(_cache) > max_cached:
+        _cache.popitem(last=False)
+    return index
@@ -4,21 +4,34 @@
 
 """Dynamic multi-agent hosting service for production (no mock sessions)."""
 import os
-from typing import Optional, List, Dict
-from fastapi import FastAPI, Query, HTTPException, Body
+from typing import Optional, List, Dict, Any
+from fastapi import FastAPI, Query, HTTPException, Body, Request
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
+from registry import AgentRegistry
+from faq_index import get_index
+
 try:
     from signalwire_agents.prefabs import ReceptionistAgent, InfoGathererAgent, FAQBotAgent
     from signalwire_agents.agent_server import AgentServer
+    from faq_agent import IndexedFAQBotAgent
 except Exception as e:  # pragma: no cover
     print("[agents_service] Import error:", e)
     ReceptionistAgent = None
     InfoGathererAgent = None
     FAQBotAgent = None
+    IndexedFAQBotAgent = None
     AgentServer = None
 
+# FAQ sets larger than this are searched through a BM25 index instead of listed in the prompt
+FAQ_PROMPT_LIMIT = int(os.getenv("FAQ_PROMPT_LIMIT", "20"))
+FAQ_TOP_K = int(os.getenv("FAQ_TOP_K", "3"))
+AGENTS_MAX_LOADED = int(os.getenv("AGENTS_MAX_LOADED", "500"))
+# Large enough for every live template plus as many recently unloaded ones, so reloading a
+# template normally reuses its index
+FAQ_INDEX_CACHE_SIZE = int(os.getenv("FAQ_INDEX_CACHE_SIZE", str(2 * AGENTS_MAX_LOADED)))
+
 app = FastAPI(title="CanvasAI Agents Host", version="1.0.0")
 
 # Pydantic models for request validation
@@ -34,8 +47,6 @@ class AgentConfig(BaseModel):
 # Central server hosting multiple prefab agents dynamically
 server: Optional[AgentServer] = AgentServer(host="0.0.0.0", port=int(os.getenv("AGENTS_PORT", "8100"))) if AgentServer else None
 
-# Keep registry of dynamic agents keyed by internal id
-dynamic_agents: Dict[str, str] = {}
 
 def _default_departments() -> List[Dict[str, str]]:
     return [
@@ -56,65 +67,166 @@ def _default_faqs() -> List[Dict[str, str]]:
         {"question": "How do I contact support?", "answer": "You can say 'support' or press 2 to be transferred."},
     ]
 
-@app.get("/health")
-async def health():
-    return {"status": "ok", "agents": len(dynamic_agents)}
-
-@app.post("/agents/create")
-async def create_agent(config: AgentConfig = Body(...)):
-    """Create an agent with custom configuration via JSON body."""
-    if not server:
-        raise HTTPException(status_code=500, detail="Agent server not initialized")
-    if config.agent_id in dynamic_agents:
-        return {"ok": True, "route": dynamic_agents[config.agent_id]}
-
-    # Validate prefab type
+def _template_config(config: AgentConfig) -> Dict[str, Any]:
+    """Resolved prefab configuration (defaults applied), without the tenant agent_id."""
     if config.prefab not in ["receptionist", "info-gatherer", "faq-bot"]:
         raise HTTPException(status_code=400, detail="Unsupported prefab")
-
-    # Get custom configurations or use defaults
-    departments = config.departments if config.departments else _default_departments()
-    questions = config.questions if config.questions else _default_questions()
-    faqs = config.faqs if config.faqs else _default_faqs()
-
-    # Create agent based on prefab type
+    resolved: Dict[str, Any] = {"prefab": config.prefab, "voice": config.voice, "language": config.language}
     if config.prefab == "receptionist":
-        agent = ReceptionistAgent(departments=departments, name=f"receptionist_{config.agent_id}")
+        resolved["departments"] = config.departments if config.departments else _default_departments()
     elif config.prefab == "info-gatherer":
-        agent = InfoGathererAgent(questions=questions, name=f"info_gatherer_{config.agent_id}")
-    elif config.prefab == "faq-bot":
-        agent = FAQBotAgent(faqs=faqs, name=f"faq_bot_{config.agent_id}")
+        resolved["questions"] = config.questions if config.questions else _default_questions()
     else:
-        raise HTTPException(status_code=400, detail="Unsupported prefab")
+        resolved["faqs"] = config.faqs if config.faqs else _default_faqs()
+    return resolved
+
+def _prepare_template(config: Dict[str, Any]):
+    """Precompute per-template data at create time (cached, so repeats are free)."""
+    if config["prefab"] == "faq-bot" and len(config["faqs"]) > FAQ_PROMPT_LIMIT:
+        get_index(config["faqs"], max_cached=FAQ_INDEX_CACHE_SIZE)
+
+def _build_agent(key: str, config: Dict[str, Any]):
+    """Build the prefab agent for a template; one instance serves every agent_id sharing it."""
+    prefab = config["prefab"]
+    if prefab == "receptionist":
+        agent = ReceptionistAgent(departments=config["departments"], name=f"receptionist_{key}")
+    elif prefab == "info-gatherer":
+        agent = InfoGathererAgent(questions=config["questions"], name=f"info_gatherer_{key}")
+    elif prefab == "faq-bot":
+        agent = _build_faq_agent(key, config["faqs"])
+    else:
+        raise ValueError(f"Unsupported prefab: {prefab}")
 
     # Voice override if provided
-    if config.voice:
+    if config.get("voice"):
         try:
-            agent.set_params({"voice": config.voice})
+            agent.set_params({"voice": config["voice"]})
         except Exception as e:
             print(f"[agents_service] Failed to set voice: {e}")
 
     # Language parameter
-    if config.language:
+    if config.get("language"):
         try:
-            agent.set_params({"language": config.language})
+            agent.set_params({"language": config["language"]})
         except Exception as e:
             print(f"[agents_service] Failed to set language: {e}")
 
-    # Register with central server using dynamic route
-    route = f"/dyn/{config.agent_id}"
+    return agent
+
+def _build_faq_agent(key: str, faqs: List[Dict[str, str]]):
+    """FAQ bot; large FAQ sets are searched through a retrieval index instead of listed in the prompt."""
+    if len(faqs) <= FAQ_PROMPT_LIMIT:
+        return FAQBotAgent(faqs=faqs, name=f"faq_bot_{key}")
+    index = get_index(faqs, max_cached=FAQ_INDEX_CACHE_SIZE)
+    return IndexedFAQBotAgent(faqs=faqs, index=index, top_k=FAQ_TOP_K, name=f"faq_bot_{key}")
+
+def _register_agent(agent, route: str):
     server.register(agent, route=route)
-    dynamic_agents[config.agent_id] = route
+
+def _unregister_agent(route: str):
+    """Remove a template's agent and its routes from the central server."""
+    if hasattr(server, "unregister"):
+        try:
+            server.unregister(route)
+        except Exception as e:
+            print(f"[agents_service] Failed to unregister {route}: {e}")
+    server.app.router.routes = [
+        r for r in server.app.router.routes
+        if not (getattr(r, "path", "") == route or getattr(r, "path", "").startswith(route + "/"))
+    ]
+
+# Persistent registry: agent_id -> shared template, rehydrated from disk at startup.
+# Live agents are built on first request and unloaded when idle.
+registry = AgentRegistry(
+    path=os.getenv("AGENTS_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "agents.db")),
+    build=_build_agent,
+    register=_register_agent,
+    unregister=_unregister_agent,
+    max_loaded=AGENTS_MAX_LOADED,
+    idle_ttl=float(os.getenv("AGENTS_IDLE_TTL", "1800")),
+)
+
+@app.middleware("http")
+async def route_dynamic_agents(request: Request, call_next):
+    """Map /dyn/{agent_id}/... onto the agent's shared template, building it if needed.
+
+    Direct /tpl/{key}/... requests (e.g. SWAIG callbacks to the template's own URL) are
+    built on demand too, since the template may have been unloaded since the call began.
+    """
+    path = request.scope["path"]
+    if server and path.startswith("/dyn/"):
+        agent_id, _, rest = path[len("/dyn/"):].partition("/")
+        key = registry.template_for(agent_id)
+        if not key or not registry.ensure_loaded(key):
+            return JSONResponse(status_code=404, content={"detail": "Agent not found"})
+        new_path = f"{AgentRegistry.template_route(key)}/{rest}" if rest else AgentRegistry.template_route(key)
+        request.scope["path"] = new_path
+        request.scope["raw_path"] = new_path.encode("utf-8")
+    elif server and path.startswith("/tpl/"):
+        key = path[len("/tpl/"):].partition("/")[0]
+        if not registry.ensure_loaded(key):
+            return JSONResponse(status_code=404, content={"detail": "Agent not found"})
+    registry.maybe_evict()
+    return await call_next(request)
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "agents": registry.count(), "templates": registry.template_count(), **registry.stats()}
+
+@app.post("/agents/create")
+async def create_agent(config: AgentConfig = Body(...)):
+    """Create an agent with custom configuration via JSON body."""
+    if not server:
+        raise HTTPException(status_code=500, detail="Agent server not initialized")
+    route = f"/dyn/{config.agent_id}"
+    if registry.template_for(config.agent_id):
+        return {"ok": True, "route": route}
+
+    resolved = _template_config(config)
+    _prepare_template(resolved)
+    registry.upsert(config.agent_id, resolved)
     return {"ok": True, "route": route}
 
+@app.put("/agents/{agent_id}")
+async def update_agent(agent_id: str, config: AgentConfig = Body(...)):
+    """Replace an agent's configuration; it is rebuilt on its next request."""
+    if not server:
+        raise HTTPException(status_code=500, detail="Agent server not initialized")
+    if config.agent_id != agent_id:
+        raise HTTPException(status_code=400, detail="agent_id in body does not match the URL")
+    if not registry.template_for(agent_id):
+        raise HTTPException(status_code=404, detail="Agent not found")
+    resolved = _template_config(config)
+    _prepare_template(resolved)
+    registry.upsert(agent_id, resolved)
+    return {"ok": True, "route": f"/dyn/{agent_id}"}
+
+@app.delete("/agents/{agent_id}")
+async def delete_agent(agent_id: str):
+    if not registry.delete(agent_id):
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return {"ok": True}
+
+@app.get("/agents")
+async def list_agents(limit: int = Query(100, ge=1, le=1000), after: Optional[str] = None):
+    """List agents ordered by agent_id; pass the last agent_id as `after` for the next page."""
+    agents = registry.list(limit=limit, after=after)
+    return {"agents": agents, "next": agents[-1]["agent_id"] if len(agents) == limit else None}
+
 @app.get("/agents/route")
 async def get_agent_route(agent_id: str):
-    route = dynamic_agents.get(agent_id)
-    if not route:
+    if not registry.template_for(agent_id):
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return {"route": f"/dyn/{agent_id}"}
+
+@app.get("/agents/{agent_id}")
+async def get_agent(agent_id: str):
+    config = registry.get_config(agent_id)
+    if config is None:
         raise HTTPException(status_code=404, detail="Agent not found")
-    return {"route": route}
+    return {"agent_id": agent_id, "route": f"/dyn/{agent_id}", "config": config}
 
-# Expose FastAPI app of agent server under /host/* for potential diagnostics
+# Serve the agent server's routes (templates under /tpl/*, reached via /dyn/*) from this app.
+# Mounted last so the management endpoints above take precedence.
 if server:
-    # Nothing extra now; server.app already has mounted routers for agents as they are created.
-    pass
+    app.mount("", server.app)
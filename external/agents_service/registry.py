@@ -0,0 +1,198 @@
+# external/agents_service/registry.py
+# Persistent agent registry with shared, lazily built agent templates.
+
+"""Agent registry backed by SQLite.
+
+Each tenant agent_id points at a template: the canonical (byte-identical)
+configuration it was created with. Templates are stored once and built into
+a live prefab agent only when a request needs them; idle templates are
+unloaded (LRU / TTL) and rebuilt on the next request.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def template_key(config: Dict[str, Any]) -> str:
+    """Hash of the canonical config; identical configs share one template."""
+    canonical = json.dumps(config, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+class AgentRegistry:
+    def __init__(
+        self,
+        path: str,
+        build: Callable[[str, Dict[str, Any]], Any],
+        register: Callable[[Any, str], None],
+        unregister: Callable[[str], None],
+        max_loaded: int = 500,
+        idle_ttl: float = 1800.0,
+    ):
+        self._build = build
+        self._register = register
+        self._unregister = unregister
+        self.max_loaded = max_loaded
+        self.idle_ttl = idle_ttl
+        # template key -> last used (monotonic), least recently used first
+        self._loaded: "OrderedDict[str, float]" = OrderedDict()
+        self._last_sweep = time.monotonic()
+        self.builds = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS templates (key TEXT PRIMARY KEY, config TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS agents (
+                agent_id TEXT PRIMARY KEY,
+                template_key TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_agents_template ON agents (template_key)")
+
+    @staticmethod
+    def template_route(key: str) -> str:
+        return f"/tpl/{key}"
+
+    # --- persistence -------------------------------------------------------
+
+    def upsert(self, agent_id: str, config: Dict[str, Any]) -> Tuple[str, bool]:
+        """Store the agent's config; returns (template key, created)."""
+        key = template_key(config)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT template_key FROM agents WHERE agent_id = ?", (agent_id,)
+            ).fetchone()
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "INSERT OR IGNORE INTO templates (key, config) VALUES (?, ?)",
+                (key, json.dumps(config, sort_keys=True)),
+            )
+            if row:
+                self._conn.execute(
+                    "UPDATE agents SET template_key = ?, updated_at = ? WHERE agent_id = ?",
+                    (key, now, agent_id),
+                )
+            else:
+                self._conn.execute(
+                    "INSERT INTO agents (agent_id, template_key, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                    (agent_id, key, now, now),
+                )
+            self._conn.execute("COMMIT")
+        if row and row[0] != key:
+            self._drop_template_if_unused(row[0])
+        return key, row is None
+
+    def delete(self, agent_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT template_key FROM agents WHERE agent_id = ?", (agent_id,)
+            ).fetchone()
+            if not row:
+                return False
+            self._conn.execute("DELETE FROM agents WHERE agent_id = ?", (agent_id,))
+        self._drop_template_if_unused(row[0])
+        return True
+
+    def _drop_template_if_unused(self, key: str):
+        with self._lock:
+            in_use = self._conn.execute(
+                "SELECT 1 FROM agents WHERE template_key = ? LIMIT 1", (key,)
+            ).fetchone()
+            if in_use:
+                return
+            self._conn.execute("DELETE FROM templates WHERE key = ?", (key,))
+        self._unload(key)
+
+    def template_for(self, agent_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT template_key FROM agents WHERE agent_id = ?", (agent_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_config(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT t.config FROM agents a JOIN templates t ON t.key = a.template_key WHERE a.agent_id = ?",
+                (agent_id,),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list(self, limit: int = 100, after: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT agent_id, template_key, created_at, updated_at FROM agents "
+                "WHERE agent_id > ? ORDER BY agent_id LIMIT ?",
+                (after or "", limit),
+            ).fetchall()
+        return [
+            {"agent_id": a, "template": k, "created_at": c, "updated_at": u}
+            for a, k, c, u in rows
+        ]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM agents").fetchone()[0]
+
+    def template_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM templates").fetchone()[0]
+
+    # --- live templates ----------------------------------------------------
+
+    def ensure_loaded(self, key: str) -> bool:
+        """Build and register the template if it isn't live; False if it doesn't exist."""
+        if key in self._loaded:
+            self._loaded[key] = time.monotonic()
+            self._loaded.move_to_end(key)
+            return True
+        with self._lock:
+            row = self._conn.execute("SELECT config FROM templates WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return False
+        agent = self._build(key, json.loads(row[0]))
+        self._register(agent, self.template_route(key))
+        self._loaded[key] = time.monotonic()
+        self.builds += 1
+        self.evict()
+        return True
+
+    def _unload(self, key: str):
+        if self._loaded.pop(key, None) is not None:
+            self._unregister(self.template_route(key))
+            self.evictions += 1
+
+    def evict(self):
+        """Unload templates idle past the TTL, then the least recently used above capacity."""
+        cutoff = time.monotonic() - self.idle_ttl
+        for key, last_used in list(self._loaded.items()):
+            if last_used >= cutoff and len(self._loaded) <= self.max_loaded:
+                break
+            self._unload(key)
+        self._last_sweep = time.monotonic()
+
+    def maybe_evict(self, interval: float = 60.0):
+        if time.monotonic() - self._last_sweep >= interval:
+            self.evict()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "loaded": len(self._loaded),
+            "max_loaded": self.max_loaded,
+            "builds": self.builds,
+            "evictions": self.evictions,
+        }
@@ -3,26 +3,155 @@ FastAPI wrapper for faceless-video-generator
 Provides REST API endpoints for video generation
 """
 
-from fastapi import FastAPI, BackgroundTasks, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
-import subprocess
+from contextlib import asynccontextmanager
+import asyncio
+import shutil
+import time
 import uuid
 import os
 import json
 from datetime import datetime
 from pathlib import Path
 
-app = FastAPI(title="Faceless Video Generator API")
-
-# Job storage (in production, use Redis or database)
-jobs = {}
+from scheduler import JobScheduler, QueueFullError, default_concurrency
+from progress import JobEvents, LineSplitter, TERMINAL_STATUSES, parse_scene_progress
+from job_store import create_job_store
+from render_cache import RenderCache, cache_key
+from delivery import faststart, is_not_modified, stat_from_metadata, video_metadata
 
 # Configuration
 OUTPUT_DIR = Path("/app/output")
 OUTPUT_DIR.mkdir(exist_ok=True)
 
+# Job storage: SQLite (WAL) shared by all workers, fronted by an in-process LRU cache
+JOB_STORE_BACKEND = os.environ.get("VIDEO_JOB_STORE", "sqlite")
+JOB_DB_PATH = os.environ.get("VIDEO_JOB_DB", str(OUTPUT_DIR / "jobs.db"))
+JOB_CACHE_SIZE = int(os.environ.get("VIDEO_JOB_CACHE_SIZE", "1024"))
+JOB_TTL_SECONDS = int(os.environ.get("VIDEO_JOB_TTL_HOURS", "24")) * 3600
+JOB_SWEEP_SECONDS = int(os.environ.get("VIDEO_JOB_SWEEP_SECONDS", "300"))
+
+jobs = create_job_store(JOB_STORE_BACKEND, JOB_DB_PATH, cache_size=JOB_CACHE_SIZE)
+
+# Delivery: optional faststart pass on completion, and optional X-Accel-Redirect prefix so a
+# fronting nginx serves the file with sendfile instead of a Python worker
+VIDEO_FASTSTART = os.environ.get("VIDEO_FASTSTART", "true").lower() == "true"
+ACCEL_REDIRECT_PREFIX = os.environ.get("VIDEO_ACCEL_REDIRECT_PREFIX", "")
+
+# Jobs record the worker process that runs them so restarts can tell which ones were interrupted
+PROCESS_STARTED = time.time()
+
+# Per-job log ring buffer and stream subscribers (jobs running in this process only)
+job_events = {}
+
+# Finished renders keyed by normalized request, reused for identical requests
+render_cache = RenderCache(
+    OUTPUT_DIR / "cache",
+    max_bytes=int(float(os.environ.get("VIDEO_CACHE_MAX_GB", "20")) * 1024 ** 3),
+    max_age_seconds=int(os.environ.get("VIDEO_CACHE_TTL_HOURS", "168")) * 3600,
+)
+
+# Render pool sizing: concurrent renders default to what the host's cores and memory allow
+MAX_CONCURRENT_JOBS = int(os.environ.get(
+    "VIDEO_MAX_CONCURRENT_JOBS",
+    default_concurrency(int(os.environ.get("VIDEO_JOB_MEMORY_MB", "2048"))),
+))
+MAX_QUEUED_JOBS = int(os.environ.get("VIDEO_MAX_QUEUED_JOBS", "20"))
+MAX_LOG_LINES = int(os.environ.get("VIDEO_MAX_LOG_LINES", "200"))
+
+scheduler = JobScheduler(concurrency=MAX_CONCURRENT_JOBS, max_queue=MAX_QUEUED_JOBS)
+
+
+def _remove_job_files(job_id: str):
+    """Delete every file a job may have left in the output directory"""
+    for name in (f"{job_id}_config.json", f"{job_id}_scenes.txt", f"{job_id}.mp4", f"{job_id}.avi", f"{job_id}.mov"):
+        (OUTPUT_DIR / name).unlink(missing_ok=True)
+    shutil.rmtree(OUTPUT_DIR / f"{job_id}_work", ignore_errors=True)
+
+
+def evict_expired_jobs() -> int:
+    """Remove finished jobs (and their files) older than the TTL"""
+    cutoff = time.time() - JOB_TTL_SECONDS
+    evicted = 0
+    while True:
+        expired = [
+            job_id for job_id in jobs.expired(cutoff)
+            # Never pull a job out from under this process while it is still running it
+            if job_id not in job_events or job_events[job_id].finished
+        ]
+        if not expired:
+            return evicted
+        for job_id in expired:
+            _remove_job_files(job_id)
+            jobs.delete(job_id)
+            job_events.pop(job_id, None)
+            evicted += 1
+
+
+def _owner_alive(job: dict) -> bool:
+    """Whether the worker process that queued a job is still running it"""
+    pid = job.get("owner_pid")
+    if pid is None:
+        return False
+    if pid == os.getpid():
+        # A restarted worker can get its predecessor's pid
+        return job.get("owner_started") == PROCESS_STARTED
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def fail_orphaned_jobs() -> int:
+    """Mark queued or running jobs whose worker process is gone as failed"""
+    failed = 0
+    for status in ("queued", "generating"):
+        cursor = None
+        while True:
+            page, cursor = jobs.list(limit=500, cursor=cursor, status=status)
+            for job in page:
+                if not _owner_alive(job):
+                    jobs.update(job["job_id"], {"status": "failed", "error": "Interrupted by a server restart"})
+                    failed += 1
+            if cursor is None:
+                break
+    return failed
+
+
+async def _eviction_loop():
+    while True:
+        try:
+            evicted = evict_expired_jobs()
+            if evicted:
+                print(f"Evicted {evicted} expired jobs")
+            render_cache.evict()
+        except Exception as e:
+            print(f"Job eviction failed: {str(e)}")
+        await asyncio.sleep(JOB_SWEEP_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    orphaned = fail_orphaned_jobs()
+    if orphaned:
+        print(f"Marked {orphaned} interrupted jobs as failed")
+    await scheduler.start()
+    eviction_task = asyncio.create_task(_eviction_loop())
+    yield
+    eviction_task.cancel()
+    # Running jobs mark themselves failed when cancelled; queued ones never started
+    for job_id in await scheduler.stop():
+        update_job(job_id, status="failed", error="Server shut down before the job started")
+
+
+app = FastAPI(title="Faceless Video Generator API", lifespan=lifespan)
+
 class VideoRequest(BaseModel):
     story_type: str = "custom"
     image_style: str = "default"
@@ -34,6 +163,8 @@ class VideoRequest(BaseModel):
     tone: str = "Neutral"
     num_scenes: int = 10
     quick_pace: bool = False
+    priority: int = 0  # lower runs first
+    use_cache: bool = True  # reuse an identical earlier render when available
 
 class JobStatus(BaseModel):
     job_id: str
@@ -43,6 +174,59 @@ class JobStatus(BaseModel):
     error: Optional[str] = None
     created_at: str
 
+# Map our API parameters to the Python script's expected format
+story_type_map = {
+    "custom": "Custom Topic",
+    "scary": "Scary",
+    "mystery": "Mystery",
+    "bedtime": "Bedtime",
+    "history": "Interesting History",
+    "urban": "Urban Legends",
+    "motivational": "Motivational",
+    "facts": "Fun Facts",
+    "jokes": "Long Form Jokes",
+    "tips": "Life Pro Tips",
+    "philosophy": "Philosophy",
+    "love": "Love"
+}
+
+image_style_map = {
+    "default": "photorealistic",
+    "pixar-art": "pixar-art",
+    "anime": "anime",
+    "comic": "comic-book",
+    "lego": "lego",
+    "cinematic": "cinematic"
+}
+
+voice_map = {
+    "radiant-girl": "alloy",
+    "magnetic-voiced-man": "onyx",
+    "compelling-lady": "nova",
+    "expressive-narrator": "fable",
+    "trustworthy-man": "echo",
+    "graceful-lady": "shimmer",
+    "aussie-bloke": "onyx",
+    "whispering-girl": "nova",
+    "diligent-man": "echo",
+    "gentle-voiced-man": "alloy"
+}
+
+def normalize_request(request: VideoRequest) -> dict:
+    """Generator parameters after mapping, used for both the script env and the cache key"""
+    return {
+        "video_title": request.video_title.strip(),
+        "story_type": story_type_map.get(request.story_type, "Custom Topic"),
+        "image_style": image_style_map.get(request.image_style, "photorealistic"),
+        "voice": voice_map.get(request.voice, "alloy"),
+        "custom_topic": (request.custom_topic or "").strip(),
+        "scenes": [scene.strip() for scene in request.scenes],
+        "output_language": request.output_language,
+        "tone": request.tone,
+        "num_scenes": request.num_scenes,
+        "quick_pace": request.quick_pace,
+    }
+
 @app.get("/")
 async def root():
     return {
@@ -52,125 +236,259 @@ async def root():
     }
 
 @app.post("/generate")
-async def generate_video(request: VideoRequest, background_tasks: BackgroundTasks):
+async def generate_video(request: VideoRequest):
     """Start video generation job"""
     
+    params = normalize_request(request)
+    key = cache_key(params)
+    
+    if request.use_cache:
+        # Identical request already queued or rendering on any worker: attach to that job
+        for active in jobs.active_for_key(key):
+            if _owner_alive(active):
+                render_cache.merged += 1
+                return {
+                    "success": True,
+                    "job_id": active["job_id"],
+                    "message": "Attached to identical in-flight job",
+                    "cached": False
+                }
+    
     # Generate unique job ID
     job_id = str(uuid.uuid4())
     
-    # Initialize job
-    jobs[job_id] = {
+    job = {
         "status": "queued",
         "progress": 0,
         "video_url": None,
         "error": None,
-        "created_at": datetime.now().isoformat()
+        "created_at": datetime.now().isoformat(),
+        "created_ts": time.time(),
+        "cache_key": key,
+        "owner_pid": os.getpid(),
+        "owner_started": PROCESS_STARTED
     }
     
-    # Start background task
-    background_tasks.add_task(process_video_generation, job_id, request)
+    video_path = OUTPUT_DIR / f"{job_id}.mp4"
+    if request.use_cache and render_cache.fetch(key, video_path):
+        jobs.put(job_id, {
+            **job,
+            **video_metadata(video_path),
+            "status": "complete",
+            "progress": 100,
+            "video_url": f"/download/{job_id}"
+        })
+        return {
+            "success": True,
+            "job_id": job_id,
+            "message": "Video served from cache",
+            "cached": True
+        }
+    
+    # Initialize job
+    jobs.put(job_id, job)
+    job_events[job_id] = JobEvents(max_log_lines=MAX_LOG_LINES)
+    
+    # Queue for the render pool; reject with backpressure when full
+    try:
+        scheduler.submit(job_id, process_video_generation, params, key, priority=request.priority)
+    except QueueFullError as e:
+        jobs.delete(job_id)
+        del job_events[job_id]
+        raise HTTPException(
+            status_code=429,
+            detail="Video generation queue is full",
+            headers={"Retry-After": str(e.retry_after)},
+        )
     
     return {
         "success": True,
         "job_id": job_id,
-        "message": "Video generation started"
+        "message": "Video generation queued",
+        "queue_depth": scheduler.queue_depth(),
+        "cached": False
+    }
+
+@app.get("/jobs")
+async def list_jobs(limit: int = Query(50, ge=1, le=500), cursor: Optional[str] = None, status: Optional[str] = None):
+    """List jobs newest first; pass next_cursor back as cursor for the next page"""
+    
+    try:
+        page, next_cursor = jobs.list(limit=limit, cursor=cursor, status=status)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    return {
+        "success": True,
+        "jobs": page,
+        "next_cursor": next_cursor
     }
 
 @app.get("/status/{job_id}")
 async def get_job_status(job_id: str):
     """Get job status"""
     
-    if job_id not in jobs:
+    job = jobs.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
     return {
         "success": True,
-        **jobs[job_id]
+        **job
     }
 
-@app.get("/download/{job_id}")
-async def download_video(job_id: str):
-    """Download generated video"""
+@app.get("/status/{job_id}/stream")
+async def stream_job_status(job_id: str):
+    """Stream job progress and log lines as Server-Sent Events"""
     
-    if job_id not in jobs:
+    job = jobs.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = jobs[job_id]
+    events = job_events.get(job_id)
+    if events is None:
+        # Job is owned by another worker process: follow it through the shared store
+        return StreamingResponse(
+            _poll_job_stream(job_id, job),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    
+    queue = events.subscribe()
+    
+    async def event_stream():
+        try:
+            job = jobs.get(job_id) or {}
+            yield _sse("snapshot", {"job_id": job_id, **job, "logs": events.tail(limit=50)})
+            if job.get("status") in TERMINAL_STATUSES:
+                return
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse(message["event"], message["data"])
+                if message["event"] == "status" and message["data"]["status"] in TERMINAL_STATUSES:
+                    return
+        finally:
+            events.unsubscribe(queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def _poll_job_stream(job_id: str, job: dict):
+    yield _sse("snapshot", {"job_id": job_id, **job, "logs": []})
+    while job["status"] not in TERMINAL_STATUSES:
+        await asyncio.sleep(1)
+        latest = jobs.get(job_id)
+        if latest is None:
+            return
+        if latest["status"] not in TERMINAL_STATUSES and not _owner_alive(latest):
+            # The owning worker died without finishing the job
+            latest = jobs.update(job_id, {"status": "failed", "error": "Worker process exited"})
+        if latest != job:
+            job = latest
+            yield _sse("status", {"job_id": job_id, **job})
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.api_route("/download/{job_id}", methods=["GET", "HEAD"])
+async def download_video(job_id: str, request: Request):
+    """Download generated video (supports HEAD, Range and conditional requests)"""
+    
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
     
     if job["status"] != "complete":
         raise HTTPException(status_code=400, detail="Video not ready")
     
+    filename = f"faceless_video_{job_id}.mp4"
     video_path = OUTPUT_DIR / f"{job_id}.mp4"
     
-    if not video_path.exists():
-        raise HTTPException(status_code=404, detail="Video file not found")
+    if ACCEL_REDIRECT_PREFIX:
+        # nginx resolves the internal location and handles ranges, caching headers and sendfile
+        return Response(
+            media_type="video/mp4",
+            headers={
+                "X-Accel-Redirect": f"{ACCEL_REDIRECT_PREFIX.rstrip('/')}/{job_id}.mp4",
+                "Content-Disposition": f'attachment; filename="{filename}"',
+            },
+        )
+    
+    # Metadata recorded at completion; only older jobs need a stat here. The file can still be
+    # removed under the record (a TTL sweep in another worker, a manual delete), and FileResponse
+    # would only notice after sending headers, so check it's there first
+    if "video_size" in job and video_path.is_file():
+        stat_result = stat_from_metadata(job)
+    else:
+        try:
+            stat_result = video_path.stat()
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Video file not found")
     
-    return FileResponse(
+    response = FileResponse(
         path=str(video_path),
         media_type="video/mp4",
-        filename=f"faceless_video_{job_id}.mp4"
+        filename=filename,
+        stat_result=stat_result
     )
+    
+    if is_not_modified(request.headers, response.headers):
+        return Response(
+            status_code=304,
+            headers={name: response.headers[name] for name in ("etag", "last-modified", "accept-ranges")},
+        )
+    
+    return response
+
+def update_job(job_id: str, **fields):
+    """Update job state and notify stream subscribers"""
+    job = jobs.update(job_id, fields)
+    job_events[job_id].publish("status", {"job_id": job_id, **job})
+
+async def _read_output(job_id: str, stream: asyncio.StreamReader, name: str, total_scenes: int):
+    """Consume child output as it arrives, turning scene markers into progress"""
+    events = job_events[job_id]
+    splitter = LineSplitter()
+    while True:
+        chunk = await stream.read(65536)
+        lines = splitter.feed(chunk) if chunk else splitter.flush()
+        for line in lines:
+            events.log(name, line)
+            scene = parse_scene_progress(line, total_scenes)
+            # The job's progress is the high-water mark shared by both streams, so it never moves back
+            if scene and scene["progress"] > jobs.get(job_id)["progress"]:
+                update_job(job_id, **scene)
+        if not chunk:
+            break
 
-async def process_video_generation(job_id: str, request: VideoRequest):
-    """Background task to generate video"""
+async def process_video_generation(job_id: str, params: dict, key: str):
+    """Scheduler job that runs the generator script for one request"""
     
     try:
         # Update status
-        jobs[job_id]["status"] = "generating"
-        jobs[job_id]["progress"] = 10
+        update_job(job_id, status="generating", progress=10)
         
         # Prepare config for Python script
         config_file = OUTPUT_DIR / f"{job_id}_config.json"
         
-        # Map our API parameters to the Python script's expected format
-        story_type_map = {
-            "custom": "Custom Topic",
-            "scary": "Scary",
-            "mystery": "Mystery",
-            "bedtime": "Bedtime",
-            "history": "Interesting History",
-            "urban": "Urban Legends",
-            "motivational": "Motivational",
-            "facts": "Fun Facts",
-            "jokes": "Long Form Jokes",
-            "tips": "Life Pro Tips",
-            "philosophy": "Philosophy",
-            "love": "Love"
-        }
-        
-        image_style_map = {
-            "default": "photorealistic",
-            "pixar-art": "pixar-art",
-            "anime": "anime",
-            "comic": "comic-book",
-            "lego": "lego",
-            "cinematic": "cinematic"
-        }
-        
-        voice_map = {
-            "radiant-girl": "alloy",
-            "magnetic-voiced-man": "onyx",
-            "compelling-lady": "nova",
-            "expressive-narrator": "fable",
-            "trustworthy-man": "echo",
-            "graceful-lady": "shimmer",
-            "aussie-bloke": "onyx",
-            "whispering-girl": "nova",
-            "diligent-man": "echo",
-            "gentle-voiced-man": "alloy"
-        }
-        
-        # Configure to use FAL instead of Replicate
-        env["USE_FAL_API"] = "true"
-        env["FAL_KEY"] = os.environ.get("FAL_KEY", "")
+        # Per-job working directory so concurrent renders can't pick up each other's output
+        work_dir = OUTPUT_DIR / f"{job_id}_work"
+        work_dir.mkdir(exist_ok=True)
         
         # Create scenes file
         scenes_file = OUTPUT_DIR / f"{job_id}_scenes.txt"
         with open(scenes_file, "w") as f:
-            for scene in request.scenes:
+            for scene in params["scenes"]:
                 f.write(f"{scene}\n")
         
-        jobs[job_id]["progress"] = 20
+        update_job(job_id, progress=20)
         
         # Build command to run Python script
         # Note: The original script is interactive, we'll need to modify it
@@ -180,74 +498,110 @@ async def process_video_generation(job_id: str, request: VideoRequest):
         
         # Set environment variables
         env = os.environ.copy()
-        env["VIDEO_TITLE"] = request.video_title
-        env["STORY_TYPE"] = story_type_map.get(request.story_type, "Custom Topic")
-        env["IMAGE_STYLE"] = image_style_map.get(request.image_style, "photorealistic")
-        env["VOICE"] = voice_map.get(request.voice, "alloy")
-        env["OUTPUT_DIR"] = str(OUTPUT_DIR)
+        env["VIDEO_TITLE"] = params["video_title"]
+        env["STORY_TYPE"] = params["story_type"]
+        env["IMAGE_STYLE"] = params["image_style"]
+        env["VOICE"] = params["voice"]
+        env["OUTPUT_DIR"] = str(work_dir)
         env["JOB_ID"] = job_id
-        env["CUSTOM_TOPIC"] = request.custom_topic or ""
-        env["NUM_SCENES"] = str(request.num_scenes)
+        env["CUSTOM_TOPIC"] = params["custom_topic"]
+        env["NUM_SCENES"] = str(params["num_scenes"])
+        
+        # Configure to use FAL instead of Replicate
+        env["USE_FAL_API"] = "true"
+        env["FAL_KEY"] = os.environ.get("FAL_KEY", "")
         
-        jobs[job_id]["progress"] = 30
+        update_job(job_id, progress=30)
         
         # Run the Python script
         # NOTE: The original script needs to be modified to accept CLI arguments
         # For now, this is a placeholder that shows the architecture
         
-        process = subprocess.Popen(
-            ["python", script_path],
+        process = await asyncio.create_subprocess_exec(
+            "python", script_path,
             cwd="/app/generator",
             env=env,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
         )
         
-        # Monitor progress
-        stdout, stderr = process.communicate()
+        # Stream output as it arrives instead of buffering it until exit
+        total_scenes = len(params["scenes"]) or params["num_scenes"]
+        try:
+            await asyncio.gather(
+                _read_output(job_id, process.stdout, "stdout", total_scenes),
+                _read_output(job_id, process.stderr, "stderr", total_scenes),
+            )
+            await process.wait()
+        finally:
+            # A failed or cancelled reader must not leave the generator running
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
         
         if process.returncode != 0:
-            raise Exception(f"Video generation failed: {stderr}")
+            stderr_tail = "\n".join(job_events[job_id].tail("stderr"))
+            raise Exception(f"Video generation failed: {stderr_tail}")
         
-        jobs[job_id]["progress"] = 90
+        update_job(job_id, progress=90)
         
         # Find generated video (the script outputs to a specific directory)
         # This will need to be adjusted based on actual output location
         generated_video = None
         for ext in [".mp4", ".avi", ".mov"]:
-            potential_path = OUTPUT_DIR / f"{job_id}{ext}"
-            if potential_path.exists():
-                generated_video = potential_path
+            for directory in (OUTPUT_DIR, work_dir):
+                potential_path = directory / f"{job_id}{ext}"
+                if potential_path.exists():
+                    generated_video = potential_path
+                    break
+            if generated_video:
                 break
         
         if not generated_video:
-            # Look for most recent video in output
-            video_files = list(OUTPUT_DIR.glob("*.mp4"))
+            # Look for most recent video in this job's working directory only
+            video_files = list(work_dir.glob("*.mp4"))
             if video_files:
                 generated_video = max(video_files, key=os.path.getctime)
-                # Rename to job_id
-                new_path = OUTPUT_DIR / f"{job_id}.mp4"
-                generated_video.rename(new_path)
-                generated_video = new_path
         
         if not generated_video:
             raise Exception("Generated video not found")
         
+        # Move the video next to the other job files and drop intermediate artifacts
+        final_path = OUTPUT_DIR / f"{job_id}{generated_video.suffix}"
+        if generated_video != final_path:
+            generated_video.rename(final_path)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        
+        if final_path.suffix == ".mp4" and VIDEO_FASTSTART:
+            await faststart(final_path)
+        
+        if final_path.suffix == ".mp4":
+            try:
+                render_cache.store(key, final_path)
+            except OSError as e:
+                print(f"Failed to cache video for job {job_id}: {str(e)}")
+        
         # Update job status
-        jobs[job_id]["status"] = "complete"
-        jobs[job_id]["progress"] = 100
-        jobs[job_id]["video_url"] = f"/download/{job_id}"
+        update_job(
+            job_id,
+            **video_metadata(final_path),
+            status="complete",
+            progress=100,
+            video_url=f"/download/{job_id}"
+        )
         
+    except asyncio.CancelledError:
+        # Shutdown: the generator was already killed above
+        update_job(job_id, status="failed", error="Cancelled during server shutdown")
+        raise
     except Exception as e:
         print(f"Error generating video for job {job_id}: {str(e)}")
-        jobs[job_id]["status"] = "failed"
-        jobs[job_id]["error"] = str(e)
+        update_job(job_id, status="failed", error=str(e))
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "jobs_count": len(jobs)}
+    return {"status": "healthy", "jobs_count": jobs.count(), "scheduler": scheduler.stats(), "cache": render_cache.stats()}
 
 if __name__ == "__main__":
     import uvicorn
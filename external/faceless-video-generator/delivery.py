@@ -0,0 +1,63 @@
+"""
+Video delivery helpers
+Precomputed file metadata for downloads and the MP4 faststart pass
+"""
+
+import asyncio
+import os
+import stat
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Mapping
+
+
+def video_metadata(path: Path) -> dict:
+    """File metadata stored on the job so downloads don't stat the file"""
+    st = path.stat()
+    return {"video_size": st.st_size, "video_mtime": st.st_mtime}
+
+
+def stat_from_metadata(job: dict) -> os.stat_result:
+    """Rebuild the stat result FileResponse uses for Content-Length, ETag and Last-Modified"""
+    mtime = job["video_mtime"]
+    return os.stat_result((stat.S_IFREG | 0o644, 0, 0, 1, 0, 0, job["video_size"], mtime, mtime, mtime))
+
+
+def is_not_modified(request_headers: Mapping[str, str], response_headers: Mapping[str, str]) -> bool:
+    """Whether a conditional GET can be answered with 304 (If-None-Match takes precedence)"""
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or response_headers["etag"] in tags
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return parsedate_to_datetime(response_headers["last-modified"]) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+async def faststart(path: Path) -> bool:
+    """Move the moov atom to the front so playback can start before the download finishes"""
+    tmp_path = path.with_name(f".{path.stem}.faststart{path.suffix}")
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-i", str(path),
+            "-c", "copy", "-map", "0",
+            "-movflags", "+faststart",
+            str(tmp_path),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except OSError as e:
+        print(f"Faststart skipped for {path.name}: {str(e)}")
+        return False
+    _, stderr = await process.communicate()
+    if process.returncode != 0:
+        tmp_path.unlink(missing_ok=True)
+        print(f"Faststart failed for {path.name}: {stderr.decode(errors='replace').strip()}")
+        return False
+    os.replace(tmp_path, path)
+    return True
@@ -0,0 +1,267 @@
+"""
+Job storage for video generation
+Pluggable backends (in-memory or SQLite/WAL) with an LRU cache in front
+"""
+
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+TERMINAL_STATUSES = ("complete", "failed")
+
+
+def encode_cursor(created_ts: float, job_id: str) -> str:
+    return f"{created_ts!r}:{job_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    created_ts, _, job_id = cursor.partition(":")
+    return float(created_ts), job_id
+
+
+class JobStore:
+    """Interface for job backends; records are plain dicts keyed by job_id"""
+
+    def get(self, job_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def put(self, job_id: str, record: dict):
+        raise NotImplementedError
+
+    def update(self, job_id: str, fields: dict) -> dict:
+        record = self.get(job_id)
+        if record is None:
+            raise KeyError(job_id)
+        record = {**record, **fields}
+        self.put(job_id, record)
+        return record
+
+    def delete(self, job_id: str):
+        raise NotImplementedError
+
+    def exists(self, job_id: str) -> bool:
+        return self.get(job_id) is not None
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def list(self, limit: int = 50, cursor: Optional[str] = None, status: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """Return a page of jobs, newest first, and the cursor for the next page"""
+        raise NotImplementedError
+
+    def expired(self, cutoff_ts: float, limit: int = 500) -> List[str]:
+        """Return ids of finished jobs created before cutoff_ts"""
+        raise NotImplementedError
+
+    def active_for_key(self, cache_key: str) -> List[dict]:
+        """Return queued or running jobs for a render cache key, oldest first"""
+        raise NotImplementedError
+
+
+class MemoryJobStore(JobStore):
+    """Process-local backend, lost on restart"""
+
+    def __init__(self):
+        self._jobs: Dict[str, dict] = {}
+
+    def get(self, job_id: str) -> Optional[dict]:
+        record = self._jobs.get(job_id)
+        return dict(record) if record is not None else None
+
+    def put(self, job_id: str, record: dict):
+        self._jobs[job_id] = dict(record)
+
+    def delete(self, job_id: str):
+        self._jobs.pop(job_id, None)
+
+    def exists(self, job_id: str) -> bool:
+        return job_id in self._jobs
+
+    def count(self) -> int:
+        return len(self._jobs)
+
+    def list(self, limit: int = 50, cursor: Optional[str] = None, status: Optional[str] = None):
+        rows = sorted(
+            ((r["created_ts"], job_id, r) for job_id, r in self._jobs.items()
+             if status is None or r["status"] == status),
+            key=lambda row: (row[0], row[1]),
+            reverse=True,
+        )
+        if cursor:
+            after = decode_cursor(cursor)
+            rows = [row for row in rows if (row[0], row[1]) < after]
+        page = rows[:limit]
+        next_cursor = encode_cursor(page[-1][0], page[-1][1]) if len(rows) > limit else None
+        return [{"job_id": job_id, **dict(r)} for _, job_id, r in page], next_cursor
+
+    def expired(self, cutoff_ts: float, limit: int = 500) -> List[str]:
+        return [
+            job_id for job_id, r in self._jobs.items()
+            if r["status"] in TERMINAL_STATUSES and r["created_ts"] < cutoff_ts
+        ][:limit]
+
+    def active_for_key(self, cache_key: str) -> List[dict]:
+        rows = sorted(
+            ((r["created_ts"], job_id, r) for job_id, r in self._jobs.items()
+             if r.get("cache_key") == cache_key and r["status"] not in TERMINAL_STATUSES),
+            key=lambda row: (row[0], row[1]),
+        )
+        return [{"job_id": job_id, **dict(r)} for _, job_id, r in rows]
+
+
+class SQLiteJobStore(JobStore):
+    """Durable backend shared by all uvicorn workers on the host"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                created_ts REAL NOT NULL,
+                cache_key TEXT,
+                data TEXT NOT NULL
+            )
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "cache_key" not in columns:
+            # Databases created before jobs were indexed by render cache key
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN cache_key TEXT")
+            self._conn.execute("UPDATE jobs SET cache_key = json_extract(data, '$.cache_key')")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created_ts, job_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_ts, job_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_cache_key ON jobs (cache_key, created_ts)")
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, job_id: str, record: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, status, created_ts, cache_key, data) VALUES (?, ?, ?, ?, ?)",
+                (job_id, record["status"], record["created_ts"], record.get("cache_key"), json.dumps(record)),
+            )
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def exists(self, job_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM jobs WHERE job_id = ?", (job_id,)).fetchone() is not None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def list(self, limit: int = 50, cursor: Optional[str] = None, status: Optional[str] = None):
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if cursor:
+            created_ts, job_id = decode_cursor(cursor)
+            clauses.append("(created_ts < ? OR (created_ts = ? AND job_id < ?))")
+            params.extend([created_ts, created_ts, job_id])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT job_id, created_ts, data FROM jobs {where} "
+                "ORDER BY created_ts DESC, job_id DESC LIMIT ?",
+                (*params, limit + 1),
+            ).fetchall()
+        page = rows[:limit]
+        next_cursor = encode_cursor(page[-1][1], page[-1][0]) if len(rows) > limit else None
+        return [{"job_id": job_id, **json.loads(data)} for job_id, _, data in page], next_cursor
+
+    def expired(self, cutoff_ts: float, limit: int = 500) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id FROM jobs WHERE status IN (?, ?) AND created_ts < ? ORDER BY created_ts LIMIT ?",
+                (*TERMINAL_STATUSES, cutoff_ts, limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def active_for_key(self, cache_key: str) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, data FROM jobs WHERE cache_key = ? AND status NOT IN (?, ?) ORDER BY created_ts",
+                (cache_key, *TERMINAL_STATUSES),
+            ).fetchall()
+        return [{"job_id": job_id, **json.loads(data)} for job_id, data in rows]
+
+
+class CachedJobStore(JobStore):
+    """LRU cache in front of a backend.
+
+    Running jobs are only written by the process that owns them, so its cached copy
+    is authoritative. Finished jobs never change but can be deleted by any worker's
+    TTL sweep, so a cached finished job is only returned while the backend still has it.
+    """
+
+    def __init__(self, backend: JobStore, max_entries: int = 1024):
+        self.backend = backend
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Tuple[dict, bool]]" = OrderedDict()
+
+    def _remember(self, job_id: str, record: dict, owned: bool):
+        self._cache[job_id] = (record, owned)
+        self._cache.move_to_end(job_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        cached = self._cache.get(job_id)
+        if cached is not None:
+            record, owned = cached
+            finished = record["status"] in TERMINAL_STATUSES
+            if (owned and not finished) or (finished and self.backend.exists(job_id)):
+                self._cache.move_to_end(job_id)
+                return dict(record)
+            if finished:
+                del self._cache[job_id]
+                return None
+        record = self.backend.get(job_id)
+        if record is not None:
+            self._remember(job_id, record, owned=False)
+            return dict(record)
+        return None
+
+    def put(self, job_id: str, record: dict):
+        self.backend.put(job_id, record)
+        self._remember(job_id, dict(record), owned=True)
+
+    def delete(self, job_id: str):
+        self.backend.delete(job_id)
+        self._cache.pop(job_id, None)
+
+    def count(self) -> int:
+        return self.backend.count()
+
+    def list(self, limit: int = 50, cursor: Optional[str] = None, status: Optional[str] = None):
+        return self.backend.list(limit=limit, cursor=cursor, status=status)
+
+    def expired(self, cutoff_ts: float, limit: int = 500) -> List[str]:
+        return self.backend.expired(cutoff_ts, limit=limit)
+
+    def active_for_key(self, cache_key: str) -> List[dict]:
+        # Other workers' jobs are only visible in the backend
+        return self.backend.active_for_key(cache_key)
+
+
+def create_job_store(backend: str, path: str, cache_size: int = 1024) -> JobStore:
+    """Build the configured backend wrapped in an LRU cache"""
+    if backend == "memory":
+        return MemoryJobStore()
+    if backend == "sqlite":
+        return CachedJobStore(SQLiteJobStore(path), max_entries=cache_size)
+    raise ValueError(f"Unknown job store backend: {backend}")
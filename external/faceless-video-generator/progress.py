@@ -0,0 +1,117 @@
+"""
+Job progress events for video generation
+Parses generator output into per-scene progress and fans events out to stream subscribers
+"""
+
+import asyncio
+import re
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from job_store import TERMINAL_STATUSES
+
+# Matches generator output such as "Scene 3/10", "scene 3 of 10" or "Generating image for scene 3"
+SCENE_PATTERN = re.compile(r"\bscene\s*#?\s*(\d+)(?:\s*(?:/|of)\s*(\d+))?", re.IGNORECASE)
+
+# Progress bars (tqdm/proglog) redraw with \r only, so both characters end a line
+LINE_BREAK = re.compile(rb"\r|\n")
+# Lines longer than this are cut short rather than buffered
+MAX_LINE_BYTES = 8192
+
+# Progress band (percent) covered by the generator process itself
+RENDER_PROGRESS_START = 30
+RENDER_PROGRESS_END = 90
+
+
+def parse_scene_progress(line: str, total_scenes: int) -> Optional[Dict[str, int]]:
+    """Map a generator log line to scene progress, or None if it doesn't mention a scene"""
+    match = SCENE_PATTERN.search(line)
+    if not match:
+        return None
+    total = int(match.group(2)) if match.group(2) else total_scenes
+    if total <= 0:
+        return None
+    scene = min(int(match.group(1)), total)
+    span = RENDER_PROGRESS_END - RENDER_PROGRESS_START
+    return {
+        "scene": scene,
+        "total_scenes": total,
+        "progress": RENDER_PROGRESS_START + span * scene // total,
+    }
+
+
+class LineSplitter:
+    """Splits raw process output into lines on \r or \n, cutting over-long lines short"""
+
+    def __init__(self, max_line_bytes: int = MAX_LINE_BYTES):
+        self.max_line_bytes = max_line_bytes
+        self._buffer = b""
+        self._skipping = False
+
+    def feed(self, chunk: bytes) -> List[str]:
+        parts = LINE_BREAK.split(self._buffer + chunk)
+        self._buffer = parts.pop()
+        lines = []
+        for part in parts:
+            if self._skipping:
+                # Remainder of a line that was already cut short
+                self._skipping = False
+                continue
+            lines.append(part)
+        if len(self._buffer) > self.max_line_bytes:
+            if not self._skipping:
+                lines.append(self._buffer[:self.max_line_bytes])
+            self._skipping = True
+            self._buffer = b""
+        return self._decode(lines)
+
+    def flush(self) -> List[str]:
+        lines = [] if self._skipping else [self._buffer]
+        self._buffer = b""
+        self._skipping = False
+        return self._decode(lines)
+
+    @staticmethod
+    def _decode(lines: List[bytes]) -> List[str]:
+        decoded = (line.decode(errors="replace").rstrip() for line in lines)
+        return [line for line in decoded if line]
+
+
+class JobEvents:
+    """Recent log lines and live subscribers for a single job"""
+
+    def __init__(self, max_log_lines: int = 200, subscriber_queue_size: int = 100):
+        self.logs: deque = deque(maxlen=max_log_lines)
+        self.subscriber_queue_size = subscriber_queue_size
+        self._subscribers: set = set()
+        # Set once this process publishes the job's final status
+        self.finished = False
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.subscriber_queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, event: str, data: dict):
+        if event == "status" and data.get("status") in TERMINAL_STATUSES:
+            self.finished = True
+        message = {"event": event, "data": {**data, "ts": time.time()}}
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Slow consumer: drop its oldest event rather than block the job
+                queue.get_nowait()
+                queue.put_nowait(message)
+
+    def log(self, stream: str, line: str):
+        self.logs.append({"stream": stream, "line": line})
+        self.publish("log", {"stream": stream, "line": line})
+
+    def tail(self, stream: Optional[str] = None, limit: int = 20) -> list:
+        lines = [entry["line"] for entry in self.logs if stream is None or entry["stream"] == stream]
+        return lines[-limit:]
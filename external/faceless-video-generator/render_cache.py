@@ -0,0 +1,107 @@
+"""
+Content-addressed render cache for video generation
+Finished videos are stored under a hash of the normalized request so identical requests reuse them
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+
+def cache_key(params: dict) -> str:
+    """Canonical hash of normalized generation parameters"""
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def link_or_copy(src: Path, dest: Path):
+    """Hard-link src to dest (no data copied), falling back to a copy across filesystems"""
+    dest.unlink(missing_ok=True)
+    try:
+        os.link(src, dest)
+    except OSError as e:
+        if isinstance(e, FileNotFoundError):
+            raise
+        shutil.copy2(src, dest)
+
+
+class RenderCache:
+    """Videos keyed by request hash with size- and age-based (least recently used) eviction"""
+
+    def __init__(self, directory: Path, max_bytes: int, max_age_seconds: int):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self.merged = 0
+        self.evictions = 0
+        self._entries = 0
+        self._bytes = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.mp4"
+
+    def fetch(self, key: str, dest: Path) -> bool:
+        """Materialize a cached video at dest; returns False on a miss"""
+        path = self._path(key)
+        try:
+            link_or_copy(path, dest)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def store(self, key: str, video_path: Path):
+        """Add a finished video to the cache and enforce the limits"""
+        tmp_path = self.directory / f".{key}.{uuid.uuid4().hex}.tmp"
+        link_or_copy(video_path, tmp_path)
+        os.replace(tmp_path, self._path(key))
+        os.utime(self._path(key))
+        self.evict()
+
+    def evict(self) -> int:
+        """Drop entries unused for longer than the max age, then the least recently used until under max size"""
+        entries = []
+        for path in self.directory.glob("*.mp4"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+
+        cutoff = time.time() - self.max_age_seconds
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for mtime, size, path in entries:
+            if mtime >= cutoff and total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+
+        self.evictions += evicted
+        self._entries = len(entries) - evicted
+        self._bytes = total
+        return evicted
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "merged": self.merged,
+            "evictions": self.evictions,
+            "entries": self._entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,133 @@
+"""
+Bounded job scheduler for video generation
+Runs render jobs on a fixed pool of asyncio workers fed by a priority queue
+"""
+
+import asyncio
+import itertools
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, List, Optional
+
+
+class QueueFullError(Exception):
+    """Raised when the scheduler queue cannot accept another job"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def default_concurrency(mem_per_job_mb: int = 2048) -> int:
+    """Size the worker pool to the cores and memory available on this host"""
+    cpu_slots = max(1, (os.cpu_count() or 2) // 2)
+    try:
+        total_mb = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+        mem_slots = max(1, total_mb // mem_per_job_mb)
+    except (AttributeError, ValueError, OSError):
+        mem_slots = cpu_slots
+    return min(cpu_slots, mem_slots)
+
+
+class JobScheduler:
+    """Fixed-size worker pool over a priority queue (lower priority runs first, FIFO within a priority)"""
+
+    def __init__(self, concurrency: int, max_queue: int, default_retry_after: int = 30):
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max(1, max_queue)
+        self.default_retry_after = default_retry_after
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: list = []
+        self._seq = itertools.count()
+        self._running = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._wait_times: deque = deque(maxlen=200)
+        self._run_times: deque = deque(maxlen=200)
+
+    async def start(self):
+        """Start worker tasks on the running event loop"""
+        if self._workers:
+            return
+        self._queue = asyncio.PriorityQueue(maxsize=self.max_queue)
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"video-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self) -> List[str]:
+        """Cancel workers and drain the queue, returning the ids of queued jobs that never ran"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        dropped = []
+        while self._queue is not None and not self._queue.empty():
+            _, _, _, job_id, _, _ = self._queue.get_nowait()
+            dropped.append(job_id)
+        return dropped
+
+    def submit(
+        self,
+        job_id: str,
+        fn: Callable[..., Awaitable[Any]],
+        *args: Any,
+        priority: int = 0,
+    ):
+        """Enqueue a job without blocking, raising QueueFullError when at capacity"""
+        if self._queue is None:
+            raise RuntimeError("Scheduler not started")
+        item = (priority, next(self._seq), time.monotonic(), job_id, fn, args)
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            raise QueueFullError(self.retry_after())
+        self._submitted += 1
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def retry_after(self) -> int:
+        """Estimate seconds until a queue slot frees up"""
+        if not self._run_times:
+            return self.default_retry_after
+        avg_run = sum(self._run_times) / len(self._run_times)
+        return max(1, math.ceil(avg_run / self.concurrency))
+
+    def stats(self) -> dict:
+        waits = list(self._wait_times)
+        runs = list(self._run_times)
+        return {
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "queue_depth": self.queue_depth(),
+            "running": self._running,
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "avg_wait_seconds": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "max_wait_seconds": round(max(waits), 3) if waits else 0.0,
+            "avg_run_seconds": round(sum(runs) / len(runs), 3) if runs else 0.0,
+        }
+
+    async def _worker(self, index: int):
+        while True:
+            _, _, enqueued_at, job_id, fn, args = await self._queue.get()
+            started_at = time.monotonic()
+            self._wait_times.append(started_at - enqueued_at)
+            self._running += 1
+            try:
+                await fn(job_id, *args)
+                self._completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._failed += 1
+                print(f"Scheduler worker {index} error on job {job_id}: {str(e)}")
+            finally:
+                self._running -= 1
+                self._run_times.append(time.monotonic() - started_at)
+                self._queue.task_done()
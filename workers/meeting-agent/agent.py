@@ -10,22 +10,33 @@ import asyncio
 import logging
 import os
 import json
-from typing import Optional
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
 from dataclasses import dataclass
 
+import httpx
+from openai import AsyncClient
+
 from livekit import rtc
 from livekit.agents import (
     AutoSubscribe,
     JobContext,
     JobProcess,
+    JobRequest,
     WorkerOptions,
     cli,
     llm,
+    stt,
+    tts,
 )
 from livekit.agents.pipeline import VoicePipelineAgent
 from livekit.plugins import openai, silero
 
-from health import start_health_server
+from health import LOAD_THRESHOLD, current_load, start_health_server_thread
+from metrics import JOIN_LATENCY, TURN_LATENCY, MetricsReporter
 
 # Configure logging
 logging.basicConfig(
@@ -49,57 +60,378 @@ class AgentConfig:
     language: Optional[str] = "en-US"
 
 
-def parse_agent_config(metadata: str) -> Optional[AgentConfig]:
-    """Parse agent configuration from room metadata"""
+def _agent_from_dict(agent: dict) -> AgentConfig:
+    return AgentConfig(
+        enabled=bool(agent.get("enabled")),
+        provider=agent.get("provider", "livekit"),
+        display_name=agent.get("displayName", "Agent"),
+        join_on_start=agent.get("joinOnStart", True),
+        llm_provider=agent.get("llmProvider", "openai"),
+        llm_model=agent.get("llmModel", "gpt-4o-mini"),
+        prompt=agent.get("prompt", "You are a helpful meeting assistant."),
+        voice=agent.get("voice"),
+        language=agent.get("language", "en-US"),
+    )
+
+
+# Parsed configs keyed by a hash of the raw room metadata
+_config_cache: "OrderedDict[str, Tuple[AgentConfig, ...]]" = OrderedDict()
+CONFIG_CACHE_SIZE = int(os.getenv("AGENT_CONFIG_CACHE_SIZE", "1024"))
+
+
+def parse_agent_configs(metadata: str) -> Tuple[AgentConfig, ...]:
+    """Parse every enabled agent from room metadata"""
+    digest = hashlib.sha1((metadata or "").encode("utf-8")).hexdigest()
+    cached = _config_cache.get(digest)
+    if cached is not None:
+        _config_cache.move_to_end(digest)
+        return cached
+    
     try:
         data = json.loads(metadata) if metadata else {}
-        agents = data.get("agents", [])
-        
-        # Find first enabled agent (can be extended to support multiple)
-        for agent in agents:
-            if agent.get("enabled"):
-                return AgentConfig(
-                    enabled=True,
-                    provider=agent.get("provider", "livekit"),
-                    display_name=agent.get("displayName", "Agent"),
-                    join_on_start=agent.get("joinOnStart", True),
-                    llm_provider=agent.get("llmProvider", "openai"),
-                    llm_model=agent.get("llmModel", "gpt-4o-mini"),
-                    prompt=agent.get("prompt", "You are a helpful meeting assistant."),
-                    voice=agent.get("voice"),
-                    language=agent.get("language", "en-US"),
-                )
-        return None
+        configs = tuple(
+            _agent_from_dict(agent)
+            for agent in data.get("agents", [])
+            if agent.get("enabled")
+        )
     except Exception as e:
         logger.error(f"Failed to parse agent config: {e}")
-        return None
+        configs = ()
+    
+    _config_cache[digest] = configs
+    while len(_config_cache) > CONFIG_CACHE_SIZE:
+        _config_cache.popitem(last=False)
+    return configs
+
+
+def joinable_agents(metadata: str) -> List[AgentConfig]:
+    """Enabled agents that should join the room as soon as it starts"""
+    return [config for config in parse_agent_configs(metadata) if config.join_on_start]
+
+
+# Provider clients are built once per job process in prewarm and kept in JobProcess.userdata,
+# keyed by (provider, kind, model/voice). All OpenAI plugins share one keep-alive HTTP pool.
+
+
+def get_openai_client(userdata: dict) -> AsyncClient:
+    """Return the process-wide OpenAI client with a pooled keep-alive connection"""
+    if "openai_client" not in userdata:
+        userdata["http_client"] = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "50")),
+                max_keepalive_connections=int(os.getenv("OPENAI_MAX_KEEPALIVE", "20")),
+                keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "120")),
+            ),
+        )
+        userdata["openai_client"] = AsyncClient(http_client=userdata["http_client"])
+    return userdata["openai_client"]
+
+
+def get_llm(config: AgentConfig, userdata: dict):
+    """Return a cached LLM client for the configured provider and model"""
+    if config.llm_provider != "openai":
+        logger.warning(f"Unknown LLM provider: {config.llm_provider}, defaulting to OpenAI")
+        model = "gpt-4o-mini"
+    else:
+        model = config.llm_model or "gpt-4o-mini"
+    clients = userdata.setdefault("clients", {})
+    key = ("openai", "llm", model)
+    if key not in clients:
+        clients[key] = openai.LLM(model=model, client=get_openai_client(userdata))
+    return clients[key]
+
+
+def get_stt(userdata: dict):
+    """Return the cached speech-to-text client"""
+    clients = userdata.setdefault("clients", {})
+    key = ("openai", "stt", "whisper-1")
+    if key not in clients:
+        clients[key] = openai.STT(client=get_openai_client(userdata))
+    return clients[key]
+
+
+def get_tts(voice: Optional[str], userdata: dict):
+    """Return a cached text-to-speech client for the voice"""
+    clients = userdata.setdefault("clients", {})
+    key = ("openai", "tts", voice or "alloy")
+    if key not in clients:
+        # For now using OpenAI TTS, can be extended to support other providers
+        clients[key] = openai.TTS(voice=voice or "alloy", client=get_openai_client(userdata))
+    return clients[key]
+
+
+async def warm_openai_connection(userdata: dict):
+    """Open the pooled TLS connection while the room connects, so the first turn doesn't pay for it"""
+    try:
+        client = get_openai_client(userdata)
+        await userdata["http_client"].head(str(client.base_url))
+    except Exception as e:
+        logger.debug(f"OpenAI connection warm-up failed: {e}")
+
+
+def prewarm(proc: JobProcess):
+    """Load models and build provider clients once per job process, before a job is assigned to it"""
+    started = time.perf_counter()
+    proc.userdata["vad"] = silero.VAD.load()
+    logger.info(f"VAD prewarmed in {time.perf_counter() - started:.2f}s")
+    
+    # Clients for the default persona; other models and voices are added on first use
+    try:
+        default = AgentConfig()
+        get_llm(default, proc.userdata)
+        get_stt(proc.userdata)
+        get_tts(default.voice, proc.userdata)
+    except Exception as e:
+        logger.warning(f"Failed to prewarm provider clients: {e}")
+
+
+class TimedLLMStream(llm.LLMStream):
+    """Wraps an LLM stream and calls on_first_token when its first chunk arrives"""
+    
+    def __init__(self, inner: llm.LLMStream, on_first_token):
+        super().__init__(chat_ctx=inner.chat_ctx, fnc_ctx=inner.fnc_ctx)
+        self._inner = inner
+        self._on_first_token = on_first_token
+    
+    @property
+    def function_calls(self):
+        return self._inner.function_calls
+    
+    def execute_functions(self):
+        return self._inner.execute_functions()
+    
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+    
+    async def __anext__(self):
+        chunk = await self._inner.__anext__()
+        if self._on_first_token is not None:
+            self._on_first_token()
+            self._on_first_token = None
+        return chunk
+
+
+class TimedSTT(stt.STT):
+    """Wraps a non-streaming STT and calls on_final each time a transcript comes back.
+    
+    The pipeline runs it behind its StreamAdapter, which calls recognize once per
+    VAD speech segment and emits the result as the final transcript.
+    """
+    
+    def __init__(self, inner: stt.STT):
+        super().__init__(capabilities=inner.capabilities)
+        self._inner = inner
+        self.on_final = None
+    
+    async def recognize(self, buffer, *, language: Optional[str] = None) -> stt.SpeechEvent:
+        event = await self._inner.recognize(buffer=buffer, language=language)
+        if self.on_final is not None:
+            self.on_final()
+        return event
+
+
+class TurnTimer:
+    """Timestamps each turn through one voice pipeline and reports stage latencies"""
+    
+    def __init__(self, assistant: VoicePipelineAgent, speech: TimedSTT, reporter: MetricsReporter):
+        self.reporter = reporter
+        self._reset()
+        assistant.on("user_stopped_speaking", self._on_end_of_speech)
+        assistant.on("agent_started_speaking", self._on_first_audio)
+        speech.on_final = self._on_stt_final
+    
+    def _reset(self):
+        self._end_of_speech = None
+        self._stt_final = None
+        self._llm_requested = None
+        self._first_token = None
+    
+    def _on_end_of_speech(self):
+        self._reset()
+        self._end_of_speech = time.perf_counter()
+    
+    def _on_stt_final(self):
+        now = time.perf_counter()
+        if self._end_of_speech is not None and self._stt_final is None:
+            self.reporter.observe(TURN_LATENCY, now - self._end_of_speech, stage="eos_to_stt_final")
+        self._stt_final = now
+    
+    def llm_requested(self, stream: llm.LLMStream) -> llm.LLMStream:
+        """Mark the LLM request (issued once the endpointing delay after the final transcript has passed)"""
+        self._llm_requested = time.perf_counter()
+        return TimedLLMStream(stream, self._on_first_token)
+    
+    def _on_first_token(self):
+        now = time.perf_counter()
+        if self._llm_requested is not None and self._first_token is None:
+            if self._stt_final is not None:
+                self.reporter.observe(TURN_LATENCY, now - self._stt_final, stage="stt_final_to_first_token")
+            self.reporter.observe(TURN_LATENCY, now - self._llm_requested, stage="llm_request_to_first_token")
+            self._first_token = now
+    
+    def _on_first_audio(self):
+        if self._first_token is not None:
+            self.reporter.observe(TURN_LATENCY, time.perf_counter() - self._first_token, stage="llm_to_tts_first_audio")
+        self._reset()
+
+
+async def request_fnc(req: JobRequest):
+    """Accept only rooms with an agent to run, before connecting to them"""
+    configs = joinable_agents(req.room.metadata)
+    if not configs:
+        logger.debug(f"Rejecting job for room {req.room.name}: no agent enabled")
+        await req.reject()
+        return
+    
+    names = [config.display_name for config in configs]
+    await req.accept(
+        name=", ".join(names),
+        metadata=json.dumps({
+            "is_agent": True,
+            "agent_type": configs[0].provider,
+            "agents": names,
+        }),
+    )
+
+
+def _pick_persona(configs: List[AgentConfig], chat_ctx: llm.ChatContext) -> int:
+    """Index of the persona that answers this turn.
+
+    A persona replies when its name appears as a whole word; if several are
+    named, the one mentioned first wins. Turns that address nobody go to the
+    first persona.
+    """
+    last = chat_ctx.messages[-1].content if chat_ctx.messages else ""
+    text = last if isinstance(last, str) else ""
+    picked, earliest = 0, None
+    for index, config in enumerate(configs):
+        match = re.search(rf"\b{re.escape(config.display_name)}\b", text, re.I)
+        if match and (earliest is None or match.start() < earliest):
+            picked, earliest = index, match.start()
+    return picked
+
+
+def _persona_prompt(config: AgentConfig, configs: List[AgentConfig]) -> str:
+    prompt = config.prompt or "You are a helpful meeting assistant. Keep responses concise and natural."
+    if len(configs) > 1:
+        others = ", ".join(c.display_name for c in configs if c is not config)
+        prompt += f"\n\nYou are {config.display_name}. Other assistants in this meeting: {others}."
+    return prompt
+
+
+class PersonaTTS(tts.TTS):
+    """Speaks with the voice of whichever persona is answering the current turn"""
+    
+    def __init__(self, voices: List[tts.TTS]):
+        super().__init__(
+            capabilities=voices[0].capabilities,
+            sample_rate=voices[0].sample_rate,
+            num_channels=voices[0].num_channels,
+        )
+        self.voices = voices
+        self.active = 0
+    
+    def synthesize(self, text: str) -> tts.ChunkedStream:
+        return self.voices[self.active].synthesize(text)
+    
+    def stream(self) -> tts.SynthesizeStream:
+        return self.voices[self.active].stream()
+
+
+def build_assistant(
+    configs: List[AgentConfig],
+    vad,
+    userdata: dict,
+    reporter: MetricsReporter,
+) -> VoicePipelineAgent:
+    """Create one voice pipeline for every persona in the room.
+
+    VAD and STT run once per room; each committed turn is answered by a single
+    persona with its own prompt, model and voice.
+    """
+    
+    # Initialize LLMs based on config
+    try:
+        models = [get_llm(config, userdata) for config in configs]
+        for config in configs:
+            logger.info(f"LLM initialized for '{config.display_name}': {config.llm_provider}/{config.llm_model}")
+    except Exception as e:
+        logger.error(f"Failed to initialize LLM: {e}", exc_info=True)
+        raise
+    
+    # Initialize text-to-speech
+    try:
+        voices = [get_tts(config.voice, userdata) for config in configs]
+        speaker = PersonaTTS(voices) if len(voices) > 1 else voices[0]
+        logger.info(f"TTS initialized with voices: {[config.voice or 'alloy' for config in configs]}")
+    except Exception as e:
+        logger.error(f"Failed to initialize TTS: {e}", exc_info=True)
+        raise
+    
+    # Create system prompts; the shared context carries the conversation, each turn gets its persona's prompt
+    prompts = [_persona_prompt(config, configs) for config in configs]
+    initial_context = llm.ChatContext().append(role="system", text=prompts[0])
+    
+    timer: Optional[TurnTimer] = None
+    
+    def before_llm(assistant: VoicePipelineAgent, chat_ctx: llm.ChatContext):
+        index = _pick_persona(configs, chat_ctx)
+        if isinstance(speaker, PersonaTTS):
+            speaker.active = index
+        persona_ctx = llm.ChatContext().append(role="system", text=prompts[index])
+        persona_ctx.messages.extend(m for m in chat_ctx.messages if m.role != "system")
+        stream = models[index].chat(chat_ctx=persona_ctx, fnc_ctx=assistant.fnc_ctx)
+        return timer.llm_requested(stream) if timer else stream
+    
+    # Create voice pipeline agent
+    try:
+        speech = TimedSTT(get_stt(userdata))
+        assistant = VoicePipelineAgent(
+            vad=vad,
+            stt=speech,  # Speech-to-text
+            llm=models[0],
+            tts=speaker,
+            chat_ctx=initial_context,
+            before_llm_cb=before_llm,
+        )
+        timer = TurnTimer(assistant, speech, reporter)
+        logger.info(f"Voice pipeline agent created for {[config.display_name for config in configs]}")
+    except Exception as e:
+        logger.error(f"Failed to create voice pipeline agent: {e}", exc_info=True)
+        raise
+    
+    return assistant
 
 
 async def entrypoint(ctx: JobContext):
     """Main entry point for agent worker"""
-    logger.info(f"Agent connecting to room: {ctx.room.name}")
+    logger.info(f"Agent connecting to room: {ctx.job.room.name}")
+    
+    join_started = time.perf_counter()
+    reporter = MetricsReporter()
     
     try:
-        # Get room metadata
-        room_info = ctx.room
-        config = parse_agent_config(room_info.metadata)
-        
-        if not config or not config.enabled:
-            logger.info(f"Agent not enabled for room {ctx.room.name}")
-            return
+        # Room metadata comes with the job, so it is available before connecting
+        configs = joinable_agents(ctx.job.room.metadata)
         
-        if not config.join_on_start:
-            logger.info(f"Agent configured but join_on_start is false for room {ctx.room.name}")
+        if not configs:
+            logger.info(f"No agent to start for room {ctx.job.room.name}")
             return
         
-        logger.info(f"Starting agent '{config.display_name}' for room {ctx.room.name}")
+        names = [config.display_name for config in configs]
+        logger.info(f"Starting agents {names} for room {ctx.job.room.name}")
         
     except Exception as e:
         logger.error(f"Failed to parse room config: {e}", exc_info=True)
         return
     
+    warm_task = None
     try:
-        # Connect to room
+        # Open the provider connection in parallel with the room connection
+        warm_task = asyncio.create_task(warm_openai_connection(ctx.proc.userdata))
+        
+        # Connect to room; all personas share this one audio subscription and pipeline
         try:
             await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
             logger.info(f"Agent connected to room {ctx.room.name}")
@@ -107,70 +439,21 @@ async def entrypoint(ctx: JobContext):
             logger.error(f"Failed to connect to room: {e}", exc_info=True)
             raise
         
-        # Initialize LLM based on config
-        try:
-            if config.llm_provider == "openai":
-                model = openai.LLM(model=config.llm_model or "gpt-4o-mini")
-            else:
-                logger.warning(f"Unknown LLM provider: {config.llm_provider}, defaulting to OpenAI")
-                model = openai.LLM(model="gpt-4o-mini")
-            logger.info(f"LLM initialized: {config.llm_provider}/{config.llm_model}")
-        except Exception as e:
-            logger.error(f"Failed to initialize LLM: {e}", exc_info=True)
-            raise
-        
-        # Initialize voice activity detection
+        # Initialize voice activity detection (prewarmed per process; load here only as a fallback)
         try:
-            vad = silero.VAD.load()
-            logger.info("VAD loaded successfully")
+            vad = ctx.proc.userdata.get("vad")
+            warm = vad is not None
+            if not warm:
+                vad = silero.VAD.load()
+                ctx.proc.userdata["vad"] = vad
+            logger.info(f"VAD ready (prewarmed={warm})")
         except Exception as e:
             logger.error(f"Failed to load VAD: {e}", exc_info=True)
             raise
         
-        # Initialize text-to-speech
-        try:
-            # For now using OpenAI TTS, can be extended to support other providers
-            tts = openai.TTS(voice=config.voice or "alloy")
-            logger.info(f"TTS initialized with voice: {config.voice or 'alloy'}")
-        except Exception as e:
-            logger.error(f"Failed to initialize TTS: {e}", exc_info=True)
-            raise
+        reporter.room_started(ctx.job.room.name)
         
-        # Create system prompt
-        initial_context = llm.ChatContext().append(
-            role="system",
-            text=config.prompt or "You are a helpful meeting assistant. Keep responses concise and natural.",
-        )
-        
-        # Create voice pipeline agent
-        try:
-            assistant = VoicePipelineAgent(
-                vad=vad,
-                stt=openai.STT(),  # Speech-to-text
-                llm=model,
-                tts=tts,
-                chat_ctx=initial_context,
-            )
-            logger.info("Voice pipeline agent created")
-        except Exception as e:
-            logger.error(f"Failed to create voice pipeline agent: {e}", exc_info=True)
-            raise
-        
-        # Update local participant name
-        try:
-            await ctx.room.local_participant.set_name(config.display_name)
-            logger.info(f"Participant name set to: {config.display_name}")
-        except Exception as e:
-            logger.warning(f"Failed to set participant name: {e}")
-        
-        # Set metadata to identify as bot
-        try:
-            await ctx.room.local_participant.set_metadata(
-                json.dumps({"is_agent": True, "agent_type": config.provider})
-            )
-            logger.info("Agent metadata set")
-        except Exception as e:
-            logger.warning(f"Failed to set metadata: {e}")
+        assistant = build_assistant(configs, vad, ctx.proc.userdata, reporter)
         
         # Start the assistant
         try:
@@ -180,17 +463,29 @@ async def entrypoint(ctx: JobContext):
             logger.error(f"Failed to start assistant: {e}", exc_info=True)
             raise
         
-        # Add greeting message
-        try:
-            await assistant.say(
-                f"Hello! I'm {config.display_name}, your AI meeting assistant. How can I help you today?",
-                allow_interruptions=True,
+        # Record join latency when the greeting starts playing out
+        def on_greeting_started():
+            join_latency = time.perf_counter() - join_started
+            reporter.observe(JOIN_LATENCY, join_latency, warm=str(warm).lower())
+            logger.info(f"Greeting spoken (join latency {join_latency:.2f}s, prewarmed={warm})")
+        
+        assistant.once("agent_started_speaking", on_greeting_started)
+        
+        # Add greeting message; the first persona introduces the others
+        if len(configs) > 1:
+            greeting = (
+                f"Hello! I'm {configs[0].display_name}, joined by {', '.join(names[1:])}. "
+                "Address any of us by name. How can we help you today?"
             )
+        else:
+            greeting = f"Hello! I'm {configs[0].display_name}, your AI meeting assistant. How can I help you today?"
+        try:
+            await assistant.say(greeting, allow_interruptions=True)
             logger.info("Greeting sent")
         except Exception as e:
             logger.warning(f"Failed to send greeting: {e}")
         
-        logger.info(f"Agent '{config.display_name}' successfully started in room {ctx.room.name}")
+        logger.info(f"Agents {names} successfully started in room {ctx.room.name}")
         
         # Keep agent running
         try:
@@ -202,22 +497,28 @@ async def entrypoint(ctx: JobContext):
     except Exception as e:
         logger.error(f"Agent error in room {ctx.room.name}: {e}", exc_info=True)
         raise
+    finally:
+        if warm_task is not None:
+            # Still pending only if the job ended before the warm-up request finished
+            warm_task.cancel()
+        await reporter.room_ended(ctx.job.room.name)
 
 
 if __name__ == "__main__":
-    # Start health check server
-    async def setup_and_run():
-        health_port = int(os.getenv("HEALTH_PORT", "8080"))
-        await start_health_server(health_port)
-        logger.info(f"Health check server running on port {health_port}")
-    
-    asyncio.get_event_loop().run_until_complete(setup_and_run())
+    # Start health check server on its own thread so it keeps serving while the worker runs
+    health_port = int(os.getenv("HEALTH_PORT", "8080"))
+    start_health_server_thread(health_port)
+    logger.info(f"Health check server running on port {health_port}")
     
     # Run the worker with CLI
     cli.run_app(
         WorkerOptions(
             entrypoint_fnc=entrypoint,
-            # Agent will monitor all rooms and join when enabled
-            request_fnc=None,
+            prewarm_fnc=prewarm,
+            # Reject rooms without an enabled agent before connecting
+            request_fnc=request_fnc,
+            # Report load so the dispatcher stops sending rooms above the threshold
+            load_fnc=current_load,
+            load_threshold=LOAD_THRESHOLD,
         )
     )
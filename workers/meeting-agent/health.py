@@ -1,24 +1,165 @@
 """
-Health check endpoint for agent worker monitoring
+Health check and metrics endpoints for agent worker monitoring
 """
 import asyncio
+import os
+import threading
+import time
 from aiohttp import web
 
+from metrics import HISTOGRAMS
 
-async def health_check(request):
-    """Simple health check endpoint"""
+# Load above this fraction reports "draining" and stops new job assignments
+LOAD_THRESHOLD = float(os.getenv("AGENT_LOAD_THRESHOLD", "0.75"))
+# Rooms this worker is sized for; active_rooms / MAX_ROOMS is the room load
+MAX_ROOMS = int(os.getenv("AGENT_MAX_ROOMS", "20"))
+
+_lock = threading.Lock()
+_active_rooms = {}  # room name -> (pid, started at)
+_jobs_total = 0
+_started_at = time.time()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def active_rooms() -> int:
+    """Rooms with a running job, dropping any whose job process died without reporting"""
+    with _lock:
+        for room, (pid, _) in list(_active_rooms.items()):
+            if not _pid_alive(pid):
+                del _active_rooms[room]
+        return len(_active_rooms)
+
+
+def current_load() -> float:
+    """Worker load in [0, 1]: the higher of room occupancy and CPU load average"""
+    room_load = active_rooms() / MAX_ROOMS if MAX_ROOMS > 0 else 0.0
+    try:
+        cpu_load = os.getloadavg()[0] / (os.cpu_count() or 1)
+    except OSError:
+        cpu_load = 0.0
+    return min(1.0, max(room_load, cpu_load))
+
+
+def _status(load: float) -> str:
+    return "draining" if load >= LOAD_THRESHOLD else "ok"
+
+
+async def liveness_check(request):
+    """Simple liveness endpoint"""
     return web.Response(text="OK", status=200)
 
 
+async def health_check(request):
+    """Health with load details; reports draining above the load threshold"""
+    load = current_load()
+    return web.json_response({
+        "status": _status(load),
+        "load": round(load, 3),
+        "load_threshold": LOAD_THRESHOLD,
+        "active_rooms": active_rooms(),
+        "max_rooms": MAX_ROOMS,
+        "jobs_total": _jobs_total,
+        "uptime_seconds": round(time.time() - _started_at),
+    })
+
+
+async def readiness_check(request):
+    """503 while draining so load balancers stop routing new work here"""
+    load = current_load()
+    status = _status(load)
+    return web.json_response({"status": status, "load": round(load, 3)}, status=200 if status == "ok" else 503)
+
+
+async def metrics(request):
+    """Prometheus text exposition"""
+    load = current_load()
+    lines = [
+        "# HELP meeting_agent_active_rooms Rooms with a running agent job",
+        "# TYPE meeting_agent_active_rooms gauge",
+        f"meeting_agent_active_rooms {active_rooms()}",
+        "# HELP meeting_agent_load Worker load reported to the dispatcher (0-1)",
+        "# TYPE meeting_agent_load gauge",
+        f"meeting_agent_load {load}",
+        "# HELP meeting_agent_draining 1 when load is above the threshold",
+        "# TYPE meeting_agent_draining gauge",
+        f"meeting_agent_draining {1 if _status(load) == 'draining' else 0}",
+        "# HELP meeting_agent_jobs_total Agent jobs started",
+        "# TYPE meeting_agent_jobs_total counter",
+        f"meeting_agent_jobs_total {_jobs_total}",
+    ]
+    lines.extend(histogram.render() for histogram in HISTOGRAMS.values())
+    return web.Response(text="\n".join(lines) + "\n", content_type="text/plain")
+
+
+def _local_only(request):
+    if request.remote not in ("127.0.0.1", "::1"):
+        raise web.HTTPForbidden()
+
+
+async def observe(request):
+    """Record an observation reported by a job process"""
+    _local_only(request)
+    payload = await request.json()
+    histogram = HISTOGRAMS.get(payload.get("metric"))
+    if histogram is None:
+        raise web.HTTPNotFound()
+    histogram.observe(float(payload["value"]), **payload.get("labels", {}))
+    return web.Response(status=204)
+
+
+async def room_event(request):
+    """Track room start/end reported by a job process"""
+    global _jobs_total
+    _local_only(request)
+    payload = await request.json()
+    with _lock:
+        if payload.get("event") == "started":
+            _active_rooms[payload["room"]] = (int(payload["pid"]), time.time())
+            _jobs_total += 1
+        else:
+            _active_rooms.pop(payload["room"], None)
+    return web.Response(status=204)
+
+
 async def start_health_server(port: int = 8080):
     """Start health check HTTP server"""
     app = web.Application()
     app.router.add_get('/health', health_check)
-    app.router.add_get('/healthz', health_check)
-    
+    app.router.add_get('/healthz', liveness_check)
+    app.router.add_get('/ready', readiness_check)
+    app.router.add_get('/metrics', metrics)
+    app.router.add_post('/internal/observe', observe)
+    app.router.add_post('/internal/rooms', room_event)
+
     runner = web.AppRunner(app)
     await runner.setup()
     site = web.TCPSite(runner, '0.0.0.0', port)
     await site.start()
-    
+
     return runner
+
+
+def start_health_server_thread(port: int = 8080) -> threading.Thread:
+    """Run the health server on its own event loop so it keeps serving alongside the worker"""
+    started = threading.Event()
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(start_health_server(port))
+        started.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, name="health-server", daemon=True)
+    thread.start()
+    started.wait(timeout=10)
+    return thread
@@ -0,0 +1,118 @@
+"""
+Lightweight latency metrics for the agent worker
+
+Jobs run in child processes, so they report observations to the health server
+in the main worker process, which aggregates and exposes them.
+"""
+import asyncio
+import bisect
+import logging
+import os
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+import aiohttp
+
+logger = logging.getLogger("meeting-agent.metrics")
+
+# Bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Cumulative histogram keyed by label values"""
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # labels -> (bucket counts, sum, count)
+        self._series: Dict[Tuple[Tuple[str, str], ...], list] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> Dict[Tuple[Tuple[str, str], ...], dict]:
+        with self._lock:
+            return {
+                key: {"buckets": list(counts), "sum": total, "count": count}
+                for key, (counts, total, count) in self._series.items()
+            }
+
+    def render(self) -> str:
+        """Prometheus text exposition of every series"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.snapshot().items()):
+            labels = ",".join(f'{k}="{v}"' for k, v in key)
+            sep = "," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, series["buckets"]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels}{sep}le="+Inf"}} {series["count"]}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {series['sum']}")
+            lines.append(f"{self.name}_count{suffix} {series['count']}")
+        return "\n".join(lines)
+
+
+JOIN_LATENCY = Histogram(
+    "meeting_agent_join_latency_seconds",
+    "Time from room metadata parse to greeting spoken",
+)
+
+# Per-turn pipeline latency, labelled by stage:
+#   eos_to_stt_final             VAD end of speech -> final transcript
+#   stt_final_to_first_token     final transcript -> first LLM token (includes the endpointing delay)
+#   llm_request_to_first_token   LLM request -> first LLM token
+#   llm_to_tts_first_audio       first LLM token -> agent starts speaking
+TURN_LATENCY = Histogram(
+    "meeting_agent_turn_latency_seconds",
+    "Voice pipeline stage latency per conversational turn",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0),
+)
+
+HISTOGRAMS: Dict[str, Histogram] = {h.name: h for h in (JOIN_LATENCY, TURN_LATENCY)}
+
+
+class MetricsReporter:
+    """Sends observations and room lifecycle events from a job process to the health server"""
+
+    def __init__(self, port: Optional[int] = None):
+        self.base_url = f"http://127.0.0.1:{port or int(os.getenv('HEALTH_PORT', '8080'))}/internal"
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._tasks: set = set()
+
+    async def _post(self, path: str, payload: dict):
+        try:
+            if self._session is None or self._session.closed:
+                self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=2))
+            async with self._session.post(f"{self.base_url}/{path}", json=payload) as resp:
+                await resp.read()
+        except Exception as e:
+            logger.debug(f"Failed to report metrics: {e}")
+
+    def _send(self, path: str, payload: dict):
+        task = asyncio.get_running_loop().create_task(self._post(path, payload))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def observe(self, histogram: Histogram, value: float, **labels: str):
+        self._send("observe", {"metric": histogram.name, "value": value, "labels": labels})
+
+    def room_started(self, room: str):
+        self._send("rooms", {"event": "started", "room": room, "pid": os.getpid()})
+
+    async def room_ended(self, room: str):
+        # Awaited so the event is delivered before the job process exits
+        await self._post("rooms", {"event": "ended", "room": room, "pid": os.getpid()})
+        if self._session is not None:
+            await self._session.close()